@@ -9,11 +9,13 @@ from rest_framework.response import Response
 from rest_framework import status
 from users.serializers import UserSerializer
 from users.models import User
+from users.usernames import usernames as username_cache
 from django.shortcuts import render
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.shortcuts import get_object_or_404
 from storages.backends.s3boto3 import S3Boto3Storage
+from backend.conditional import conditional_get, make_etag
 import os
 import uuid
 from google.oauth2 import id_token
@@ -215,6 +217,7 @@ def google_login(request):
 def participants_to_usernames(request):
     """
     GET: Receives a list of user IDs in query params and returns their corresponding usernames.
+      - At most USERNAME_LOOKUP_MAX ids; unknown ids map to None.
     """
     # Fix: Get data from query params instead of request.data for GET request
     participant_ids_param = request.GET.get('participants', '')
@@ -223,18 +226,20 @@ def participants_to_usernames(request):
     if not participant_ids_param:
         return Response({"error": "'participants' should not be empty"}, status=400)
     
-    participant_ids = [int(id_str) for id_str in participant_ids_param.split(',') if id_str]
+    try:
+        participant_ids = [int(id_str) for id_str in participant_ids_param.split(',') if id_str]
+    except ValueError:
+        return Response({"error": "'participants' must be comma-separated user ids"}, status=400)
     
     if not participant_ids:
         return Response({"error": "'participants' should not be empty"}, status=400)
-    
-    usernames = []
-    for user_id in participant_ids:
-        try:
-            user = User.objects.get(pk=user_id)
-            usernames.append(user.username)
-        except User.DoesNotExist:
-            usernames.append(None)
+
+    maximum = getattr(settings, 'USERNAME_LOOKUP_MAX', 500)
+    if len(participant_ids) > maximum:
+        return Response({"error": f"At most {maximum} participants per request"}, status=400)
+
+    # One query for every id not already cached; order and None for unknown ids are kept
+    usernames = username_cache.get_many(participant_ids)
 
     return Response({"usernames": usernames}, status=200)
 
@@ -258,14 +263,28 @@ def upload_profile_image(request):
     else:
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def profile_validators(request, pk):
+    updated_at = User.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    # Users see their own email even when it is hidden from everyone else
+    viewer = 'self' if request.user.pk == pk else 'other'
+    return make_etag(f"{pk}-{updated_at.timestamp():.6f}-{viewer}"), updated_at
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional_get(profile_validators, vary=['Authorization'])
 def user_profile(request, pk):
     """
-    GET: Get user profile
+    GET: Get user profile (ETag / Last-Modified; 304 when unchanged)
+      - fields / exclude (optional): comma-separated subset of the profile's fields
     """
-    user = get_object_or_404(User, pk=pk)
-    serializer = UserSerializer(user, context={'request': request})
+    try:
+        fields = UserSerializer.requested_fields(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    user = get_object_or_404(UserSerializer.narrow(User.objects.all(), fields), pk=pk)
+    serializer = UserSerializer(user, fields=fields, context={'request': request})
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
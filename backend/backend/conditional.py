@@ -0,0 +1,55 @@
+"""
+Conditional GET helpers for the DRF function views.
+
+A resource's validators (ETag and Last-Modified) are computed from a cheap query before
+anything is serialized; a matching If-None-Match / If-Modified-Since is answered with
+304 Not Modified straight away.
+"""
+from functools import wraps
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(value, weak=False):
+    etag = quote_etag(str(value))
+    return f'W/{etag}' if weak else etag
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    304 response if the client's copy is current, else None. Only GET/HEAD are answered.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def set_validators(response, etag, last_modified=None, vary=()):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        if last_modified:
+            response.headers.setdefault('Last-Modified', http_date(int(last_modified.timestamp())))
+    if vary:
+        patch_vary_headers(response, vary)
+    return response
+
+
+def conditional_get(validators, vary=()):
+    """
+    View decorator, applied inside @api_view. validators(request, *args, **kwargs) returns
+    (etag, last_modified) for the requested resource, or None to run the view unconditionally.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            current = validators(request, *args, **kwargs)
+            if current is None:
+                return view(request, *args, **kwargs)
+            etag, last_modified = current
+            response = not_modified(request, etag, last_modified) or view(request, *args, **kwargs)
+            return set_validators(response, etag, last_modified, vary)
+        return wrapper
+    return decorator
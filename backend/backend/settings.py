@@ -129,7 +129,9 @@ DATABASES = {
     }
 }
 
-if "GITHUB_ACTIONS" in os.environ or "pytest" in sys.modules or "test" in sys.argv:
+TESTING = "GITHUB_ACTIONS" in os.environ or "pytest" in sys.modules or "test" in sys.argv
+
+if TESTING:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
@@ -211,4 +213,69 @@ AWS_S3_CUSTOM_DOMAIN = f"{AWS_STORAGE_BUCKET_NAME}.s3.{AWS_S3_REGION_NAME}.amazo
 AWS_DEFAULT_ACL = 'public-read'
 
 DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
-MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/'
\ No newline at end of file
+MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/'
+# Seconds an in-memory per-city vector index may be served before it is reloaded
+VECTOR_INDEX_TTL = int(os.getenv('VECTOR_INDEX_TTL', '300'))
+
+# Storage format for Event.vector: float32 (exact), float16 or int8 (quantized)
+EVENT_VECTOR_DTYPE = os.getenv('EVENT_VECTOR_DTYPE', 'float32')
+
+# Text embedding backend used by events.semantic_search.
+# Tests default to the deterministic hashing fake so they need no model downloads.
+EMBEDDING_BACKEND = os.getenv(
+    'EMBEDDING_BACKEND',
+    'events.semantic_search.HashingBackend' if TESTING else 'events.semantic_search.SentenceTransformerBackend',
+)
+# Quantized model file used by events.semantic_search.OnnxBackend
+EMBEDDING_ONNX_FILE = os.getenv('EMBEDDING_ONNX_FILE', 'onnx/model_quint8_avx2.onnx')
+
+# In-process LRU cache of search query embeddings
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', '1024'))
+QUERY_EMBEDDING_CACHE_TTL = int(os.getenv('QUERY_EMBEDDING_CACHE_TTL', '3600'))
+
+# Shared embedding server (manage.py run_embedding_server), used when
+# EMBEDDING_BACKEND = 'events.embedding_server.RemoteBackend'
+EMBEDDING_SERVER_ADDRESS = os.getenv('EMBEDDING_SERVER_ADDRESS', 'unix:/tmp/buddyup-embedding.sock')
+EMBEDDING_SERVER_BACKEND = os.getenv('EMBEDDING_SERVER_BACKEND', 'events.semantic_search.SentenceTransformerBackend')
+EMBEDDING_SERVER_MAX_BATCH = int(os.getenv('EMBEDDING_SERVER_MAX_BATCH', '64'))
+EMBEDDING_SERVER_MAX_WAIT_MS = float(os.getenv('EMBEDDING_SERVER_MAX_WAIT_MS', '5'))
+EMBEDDING_SERVER_TIMEOUT = float(os.getenv('EMBEDDING_SERVER_TIMEOUT', '10'))
+# Seconds to use the in-process backend before trying an unreachable server again
+EMBEDDING_SERVER_RETRY = float(os.getenv('EMBEDDING_SERVER_RETRY', '30'))
+
+# Embed new or edited events on a background thread instead of inside the request
+EMBEDDING_ASYNC = os.getenv('EMBEDDING_ASYNC', 'false').lower() == 'true'
+# With EMBEDDING_ASYNC, queue vectors from another embedding model for re-embedding when a
+# city's index loads; otherwise they wait for manage.py reindex_vectors
+VECTOR_REEMBED_STALE = os.getenv('VECTOR_REEMBED_STALE', 'true').lower() == 'true'
+
+# Bulk event import (POST /api/events/import/, manage.py import_events)
+EVENT_IMPORT_MAX_ROWS = int(os.getenv('EVENT_IMPORT_MAX_ROWS', '1000'))
+EVENT_IMPORT_EMBED_BATCH = int(os.getenv('EVENT_IMPORT_EMBED_BATCH', '256'))
+
+# Shared cache for seat holds and vector index generations. Without REDIS_URL every
+# process keeps its own in-memory cache.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
+# Seat holds for high-demand joins (POST /api/events/<pk>/hold/)
+SEAT_HOLD_TTL = int(os.getenv('SEAT_HOLD_TTL', '120'))
+# Seconds a cached free-seat count may be served before it is re-read
+SEAT_SNAPSHOT_TTL = int(os.getenv('SEAT_SNAPSHOT_TTL', '10'))
+
+# Cursor pagination for filter_events / search_events (?cursor=, ?page_size=)
+EVENT_PAGE_SIZE = int(os.getenv('EVENT_PAGE_SIZE', '20'))
+EVENT_PAGE_SIZE_MAX = int(os.getenv('EVENT_PAGE_SIZE_MAX', '100'))
+
+# Most ids GET /api/events/?ids= accepts in one request
+EVENT_BATCH_MAX = int(os.getenv('EVENT_BATCH_MAX', '100'))
+
+# participants_to_usernames: most ids per request, and the in-process id => username cache
+USERNAME_LOOKUP_MAX = int(os.getenv('USERNAME_LOOKUP_MAX', '500'))
+USERNAME_CACHE_SIZE = int(os.getenv('USERNAME_CACHE_SIZE', '10000'))
+USERNAME_CACHE_TTL = int(os.getenv('USERNAME_CACHE_TTL', '300'))
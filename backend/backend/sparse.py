@@ -0,0 +1,77 @@
+"""
+Sparse fieldsets for read endpoints: ?fields=id,title or ?exclude=description,participants.
+
+The requested names narrow the serialized output and, through only(), the columns the
+queryset loads, so a card listing doesn't read or send columns it never shows.
+"""
+
+
+def _split(value):
+    names = [name.strip() for name in (value or '').split(',') if name.strip()]
+    return names or None
+
+
+def parse_fields(request, available):
+    """
+    Names to serialize, in `available` order, from ?fields= / ?exclude= (comma separated),
+    or None when neither is given. Raises ValueError for unknown names or for both parameters.
+    """
+    fields = _split(request.GET.get('fields'))
+    exclude = _split(request.GET.get('exclude'))
+    if fields is None and exclude is None:
+        return None
+    if fields is not None and exclude is not None:
+        raise ValueError("Use either 'fields' or 'exclude', not both.")
+    unknown = [name for name in fields or exclude if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(available)}.")
+    if fields is not None:
+        return [name for name in available if name in fields]
+    return [name for name in available if name not in exclude]
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin taking fields=[...] to serialize only those readable fields.
+    Meta.column_sources maps fields that aren't model columns (or read more than their
+    own column) to the model fields they need loaded.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name, field in list(self.fields.items()):
+                if name not in fields and not field.write_only:
+                    self.fields.pop(name)
+
+    @classmethod
+    def readable_fields(cls):
+        return [name for name, field in cls().fields.items() if not field.write_only]
+
+    @classmethod
+    def requested_fields(cls, request):
+        """
+        parse_fields() against this serializer's readable fields
+        """
+        return parse_fields(request, cls.readable_fields())
+
+    @classmethod
+    def columns(cls, names):
+        opts = cls.Meta.model._meta
+        concrete = {field.name for field in opts.concrete_fields}
+        sources = getattr(cls.Meta, 'column_sources', {})
+        columns = [opts.pk.name]
+        for name in names:
+            for column in sources.get(name, [name] if name in concrete else []):
+                if column not in columns:
+                    columns.append(column)
+        return columns
+
+    @classmethod
+    def narrow(cls, queryset, names, extra=()):
+        """
+        queryset loading only the columns `names` (plus `extra`) serialize from; unchanged for None
+        """
+        if names is None:
+            return queryset
+        return queryset.only(*cls.columns(names), *extra)
@@ -1,6 +1,17 @@
 from django.contrib import admin
-from .models import Event
+from .models import Category, City, Event, WaitlistEntry
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     list_display = ('id', 'title', 'creator', 'capacity', 'attendance', 'start_time', 'end_time')
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'event', 'user', 'created_at')
+
+
+@admin.register(City, Category)
+class LookupNameAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'key')
+    search_fields = ('name',)
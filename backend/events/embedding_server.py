@@ -0,0 +1,278 @@
+"""
+Optional shared embedding service.
+
+One process (`manage.py run_embedding_server`) loads the model once and serves every
+gunicorn worker over a Unix socket or localhost TCP. Concurrent requests are collected
+for up to EMBEDDING_SERVER_MAX_WAIT_MS (or until EMBEDDING_SERVER_MAX_BATCH texts) and
+encoded in a single batch. Workers opt in with
+EMBEDDING_BACKEND = 'events.embedding_server.RemoteBackend'.
+
+Wire format, both directions: 4-byte big-endian length followed by a JSON object.
+"""
+import base64
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+from .semantic_search import EmbeddingBackend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = 'unix:/tmp/buddyup-embedding.sock'
+_LENGTH = struct.Struct('>I')
+
+
+def parse_address(address):
+    """
+    'unix:/path/to.sock' => (AF_UNIX, path), 'host:port' => (AF_INET, (host, port))
+    """
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("Embedding server connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def send_message(sock, message):
+    payload = json.dumps(message).encode('utf-8')
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def recv_message(sock):
+    (size,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    return json.loads(_recv_exact(sock, size))
+
+
+def encode_array(array):
+    array = np.ascontiguousarray(array, dtype='<f4')
+    return {'shape': list(array.shape), 'data': base64.b64encode(array.tobytes()).decode('ascii')}
+
+
+def decode_array(message):
+    return np.frombuffer(base64.b64decode(message['data']), dtype='<f4').reshape(message['shape'])
+
+
+class MicroBatcher:
+    """
+    Collects texts from concurrent callers and embeds them in one backend call per batch
+    """
+
+    def __init__(self, backend, max_batch_size=64, max_wait=0.005):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, texts):
+        """
+        Queue texts for embedding, returns a Future resolving to a (len(texts), dim) array
+        """
+        future = Future()
+        self._queue.put((list(texts), future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = self.backend.embed(texts) if texts else np.empty((0, self.backend.dimension))
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            start = 0
+            for item_texts, future in batch:
+                future.set_result(vectors[start:start + len(item_texts)])
+                start += len(item_texts)
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                if message.get('op') == 'info':
+                    response = {'model_id': server.batcher.backend.model_id,
+                                'dimension': server.batcher.backend.dimension}
+                else:
+                    vectors = server.batcher.submit(message.get('texts', [])).result()
+                    response = encode_array(vectors)
+            except Exception as exc:
+                logger.exception("Embedding request failed")
+                response = {'error': str(exc)}
+            send_message(self.request, response)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_server(address, backend, max_batch_size=64, max_wait=0.005):
+    """
+    Build (but don't start) an embedding server bound to address
+    """
+    family, bind_address = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(bind_address):
+            os.remove(bind_address)
+        server = _UnixServer(bind_address, _RequestHandler)
+    else:
+        server = _TCPServer(bind_address, _RequestHandler)
+    server.batcher = MicroBatcher(backend, max_batch_size=max_batch_size, max_wait=max_wait)
+    return server
+
+
+class RemoteBackend(EmbeddingBackend):
+    """
+    Embedding backend that forwards texts to the shared embedding server.
+    Falls back to EMBEDDING_SERVER_BACKEND in-process if the server can't be reached, and
+    doesn't try the server again for EMBEDDING_SERVER_RETRY seconds.
+    """
+
+    def __init__(self):
+        self.address = getattr(settings, 'EMBEDDING_SERVER_ADDRESS', DEFAULT_ADDRESS)
+        self.timeout = getattr(settings, 'EMBEDDING_SERVER_TIMEOUT', 10)
+        self._local = threading.local()
+        self._info = None
+        self._fallback = None
+        self._retry_at = 0.0
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            family, address = parse_address(self.address)
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(address)
+            self._local.sock = sock
+        return sock
+
+    def _request(self, message):
+        # One persistent connection per thread; retry once on a fresh connection if it went stale
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                send_message(sock, message)
+                response = recv_message(sock)
+                break
+            except OSError:
+                self._close()
+                if attempt:
+                    raise
+        if 'error' in response:
+            raise RuntimeError(f"Embedding server error: {response['error']}")
+        return response
+
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _fallback_backend(self):
+        if self._fallback is None:
+            path = getattr(settings, 'EMBEDDING_SERVER_BACKEND', 'events.semantic_search.SentenceTransformerBackend')
+            self._fallback = import_string(path)()
+        return self._fallback
+
+    def _server_available(self):
+        return time.monotonic() >= self._retry_at
+
+    def _server_down(self):
+        retry = getattr(settings, 'EMBEDDING_SERVER_RETRY', 30)
+        self._retry_at = time.monotonic() + retry
+        logger.warning("Embedding server at %s unavailable, using in-process backend for %ss", self.address, retry)
+
+    @property
+    def info(self):
+        """
+        The server's model id and dimension. Until the server has answered once they are the
+        fallback's; after that they are kept through outages, so model_id never flips back and forth.
+        """
+        if self._info is None and self._server_available():
+            try:
+                self._info = self._request({'op': 'info'})
+            except OSError:
+                self._server_down()
+        if self._info is not None:
+            return self._info
+        fallback = self._fallback_backend()
+        return {'model_id': fallback.model_id, 'dimension': fallback.dimension}
+
+    @property
+    def model_id(self):
+        return self.info['model_id']
+
+    @property
+    def dimension(self):
+        return self.info['dimension']
+
+    def embed(self, texts):
+        # The server preprocesses, so raw texts are sent as-is
+        if self._server_available():
+            try:
+                return decode_array(self._request({'texts': list(texts)}))
+            except OSError:
+                self._server_down()
+        fallback = self._fallback_backend()
+        if self._info is not None and fallback.model_id != self._info['model_id']:
+            # Its vectors would be stamped with the server's model id
+            raise RuntimeError(
+                f"Embedding server at {self.address} is unavailable and the in-process backend "
+                f"is a different model ({fallback.model_id}, not {self._info['model_id']})"
+            )
+        return fallback.embed(texts)
+
+    def warm_up(self):
+        try:
+            self.info
+        except RuntimeError:
+            pass
@@ -0,0 +1,88 @@
+import base64
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+
+# Packed layout: 4-byte header (dtype code + padding, keeps the body aligned) followed by raw little-endian values
+HEADER_SIZE = 4
+VECTOR_DTYPES = {
+    'float32': 0,
+    'float16': 1,
+    'int8': 2,
+}
+INT8_SCALE = 127.0
+
+
+def pack_vector(vector, dtype=None):
+    """
+    Pack a vector (list, ndarray or already packed bytes) into the binary column format.
+    int8 vectors are L2-normalized before quantizing; cosine similarity is unaffected.
+    """
+    if vector is None:
+        return None
+    if isinstance(vector, (bytes, bytearray, memoryview)):
+        return bytes(vector)
+
+    dtype = dtype or getattr(settings, 'EVENT_VECTOR_DTYPE', 'float32')
+    if dtype not in VECTOR_DTYPES:
+        raise ImproperlyConfigured(
+            f"Unsupported EVENT_VECTOR_DTYPE: {dtype}. Allowed: {', '.join(VECTOR_DTYPES)}."
+        )
+
+    arr = np.asarray(vector, dtype=np.float32).ravel()
+    if dtype == 'float16':
+        body = arr.astype('<f2')
+    elif dtype == 'int8':
+        norm = np.linalg.norm(arr)
+        if norm:
+            arr = arr / norm
+        body = np.clip(np.rint(arr * INT8_SCALE), -INT8_SCALE, INT8_SCALE).astype(np.int8)
+    else:
+        body = arr.astype('<f4')
+
+    header = bytes([VECTOR_DTYPES[dtype]]) + bytes(HEADER_SIZE - 1)
+    return header + body.tobytes()
+
+
+def unpack_vector(data):
+    """
+    Decode a packed vector into a float32 ndarray.
+    float32 payloads are returned as a read-only zero-copy view over the buffer.
+    """
+    if data is None:
+        return None
+    buf = memoryview(data)
+    code = buf[0]
+    if code == VECTOR_DTYPES['float32']:
+        return np.frombuffer(buf, dtype='<f4', offset=HEADER_SIZE)
+    if code == VECTOR_DTYPES['float16']:
+        return np.frombuffer(buf, dtype='<f2', offset=HEADER_SIZE).astype(np.float32)
+    if code == VECTOR_DTYPES['int8']:
+        return np.frombuffer(buf, dtype=np.int8, offset=HEADER_SIZE).astype(np.float32) / INT8_SCALE
+    raise ValueError(f"Unknown packed vector dtype code: {code}")
+
+
+class VectorField(models.BinaryField):
+    """
+    Stores an embedding as packed binary (see pack_vector) and loads it back as a float32 ndarray
+    """
+    # Model validation tests `value in empty_values`, which is ambiguous for ndarrays
+    empty_values = []
+
+    def from_db_value(self, value, expression, connection):
+        return unpack_vector(value)
+
+    def to_python(self, value):
+        if isinstance(value, str):
+            value = base64.b64decode(value.encode('ascii'))
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return unpack_vector(value)
+        return value
+
+    def get_prep_value(self, value):
+        return pack_vector(value)
+
+    def value_to_string(self, obj):
+        packed = pack_vector(self.value_from_object(obj))
+        return base64.b64encode(packed).decode('ascii') if packed is not None else None
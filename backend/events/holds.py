@@ -0,0 +1,170 @@
+"""
+Short-lived seat holds for high-demand joins.
+
+Free seats (capacity - attendance) are read from a short-lived cached snapshot. Live holds
+are counted in per-event cache counters, one per slice of the hold TTL. Taking a hold is an
+atomic cache.incr() on the current slice, kept only if every counted hold still fits in the
+free seats, so a flash crowd is admitted or turned away by a few cache calls however large
+the event is. Releasing or confirming a hold decrements its slice straight away; a hold that
+simply expires stops counting when its slice's counter expires, at most two slices later.
+Confirming a hold (POST /join/ with {"hold": ...}) is the only database write, and
+Event.join's conditional UPDATE remains the final guard against overbooking.
+
+The waitlist only gets seats that are free and not held: Event.join_waitlist queues the user
+while every free seat is held, and a leave promotes the head of the waitlist only if a seat
+is left over after the live holds. A released hold's seat goes to the waitlist straight
+away; a seat whose hold simply expires goes to it at the next leave or release.
+
+Holds are only shared between processes when the default cache is (see REDIS_URL).
+"""
+import math
+import secrets
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+# Slices per hold TTL: an expired hold keeps counting for up to 2 / HOLD_SLICES of the TTL
+HOLD_SLICES = 4
+
+
+class SeatHolds:
+    """
+    Cache-backed seat reservations keyed by event pk
+    """
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'SEAT_HOLD_TTL', 120)
+
+    @property
+    def snapshot_ttl(self):
+        return getattr(settings, 'SEAT_SNAPSHOT_TTL', 10)
+
+    @property
+    def slice_width(self):
+        return max(self.ttl / HOLD_SLICES, 1)
+
+    def _seats_key(self, pk):
+        return f'event-seats:{pk}'
+
+    def _count_key(self, pk, slice_):
+        return f'event-held:{pk}:{slice_}'
+
+    def _hold_key(self, pk, token):
+        return f'event-hold:{pk}:{token}'
+
+    def _user_key(self, pk, user):
+        return f'event-hold-user:{pk}:{user.pk}'
+
+    def free_seats(self, pk):
+        """
+        Seats not taken by participants, from the cached snapshot. Raises Event.DoesNotExist.
+        """
+        free = cache.get(self._seats_key(pk))
+        if free is None:
+            from .models import Event
+            row = Event.objects.filter(pk=pk).values_list('capacity', 'attendance').first()
+            if row is None:
+                raise Event.DoesNotExist("No Event matches the given query.")
+            free = max(row[0] - row[1], 0)
+            cache.set(self._seats_key(pk), free, self.snapshot_ttl)
+        return free
+
+    def held(self, pk):
+        """
+        Live holds on the event (possibly counting recently expired ones, never missing a live one)
+        """
+        current = int(time.time() // self.slice_width)
+        # A slice's counter outlives its newest hold by at most one slice
+        oldest = current - math.ceil(self.ttl / self.slice_width) - 1
+        keys = [self._count_key(pk, slice_) for slice_ in range(oldest, current + 1)]
+        return max(sum(cache.get_many(keys).values()), 0)
+
+    def available(self, pk):
+        """
+        Seats that are neither taken nor held
+        """
+        free = self.free_seats(pk)
+        return max(free - self.held(pk), 0) if free else 0
+
+    def fully_held(self, pk):
+        """
+        Whether live holds cover every free seat, turning a plain join away from the cache.
+        A snapshot with no free seats may predate a leave in another process, so it is left
+        to Event.join to decide.
+        """
+        free = self.free_seats(pk)
+        return bool(free) and self.held(pk) >= free
+
+    def _decrement(self, key):
+        try:
+            cache.decr(key)
+        except ValueError:
+            # The counter already expired along with the holds it counted
+            pass
+
+    def acquire(self, pk, user):
+        """
+        Hold a seat for user. Returns a hold id ('<slice>:<token>'), or None if every seat is taken or held.
+        A user asking again while their hold is live gets the same hold back.
+        """
+        existing = cache.get(self._user_key(pk, user))
+        if existing and self.is_valid(pk, user, existing):
+            return existing
+
+        free = self.free_seats(pk)
+        if not free:
+            return None
+        slice_ = int(time.time() // self.slice_width)
+        key = self._count_key(pk, slice_)
+        cache.add(key, 0, self.ttl + self.slice_width)
+        try:
+            cache.incr(key)
+        except ValueError:
+            return None
+        # Count first, then check: concurrent callers may both back off, but can never both get the last seat
+        if self.held(pk) > free:
+            self._decrement(key)
+            return None
+
+        token = secrets.token_urlsafe(12)
+        hold_id = f'{slice_}:{token}'
+        cache.set(self._hold_key(pk, token), f'{user.pk}:{slice_}', self.ttl)
+        cache.set(self._user_key(pk, user), hold_id, self.ttl)
+        return hold_id
+
+    def is_valid(self, pk, user, hold_id):
+        slice_, _, token = str(hold_id).partition(':')
+        if not slice_.lstrip('-').isdigit() or not token:
+            return False
+        return cache.get(self._hold_key(pk, token)) == f'{user.pk}:{int(slice_)}'
+
+    def _end(self, pk, user, hold_id):
+        if not self.is_valid(pk, user, hold_id):
+            return False
+        slice_, _, token = str(hold_id).partition(':')
+        # Only the caller that actually deletes the hold gives its count back
+        if not cache.delete(self._hold_key(pk, token)):
+            return False
+        self._decrement(self._count_key(pk, int(slice_)))
+        cache.delete(self._user_key(pk, user))
+        return True
+
+    def release(self, pk, user, hold_id):
+        """
+        Give a held seat back to the pool. Returns False if the hold was not live.
+        """
+        return self._end(pk, user, hold_id)
+
+    def confirmed(self, pk, user, hold_id):
+        """
+        Called once a held seat has been written to the database, which already took it out of
+        the free-seat snapshot, so the hold stops counting.
+        """
+        self._end(pk, user, hold_id)
+
+    def invalidate(self, pk):
+        cache.delete(self._seats_key(pk))
+
+
+seat_holds = SeatHolds()
@@ -0,0 +1,102 @@
+"""
+Bulk event import shared by POST /api/events/import/ and `manage.py import_events`.
+
+Rows are validated together, embedded in large batches and written with bulk_create.
+An import is all-or-nothing: if any row is invalid nothing is created.
+"""
+import csv
+import io
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .models import Event, VectorState, category_ids, city_ids
+from .semantic_search import current_model_id, texts_to_vectors, vector_index
+from .serializers import EventSerializer
+
+
+def parse_rows(content, fmt):
+    """
+    Parse CSV (header row required) or JSON (a list, or {"events": [...]}) into a list of dicts
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if fmt == 'csv':
+        return [dict(row) for row in csv.DictReader(io.StringIO(content))]
+    if fmt == 'json':
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get('events')
+        if not isinstance(data, list):
+            raise ValueError("JSON imports must be a list of events or {\"events\": [...]}")
+        return data
+    raise ValueError(f"Unsupported import format: {fmt}. Allowed: csv, json.")
+
+
+def validate_rows(rows, creator):
+    """
+    Validate every row. Returns (events, errors); errors maps row index => messages.
+    Model validation skips the creator lookup so no query is issued per row.
+    """
+    serializer = EventSerializer(data=rows, many=True)
+    if not serializer.is_valid():
+        if isinstance(serializer.errors, dict):
+            return [], serializer.errors
+        return [], {index: row_errors for index, row_errors in enumerate(serializer.errors) if row_errors}
+
+    errors = {}
+    events = []
+    for index, data in enumerate(serializer.validated_data):
+        event = Event(creator=creator, **data)
+        try:
+            event.full_clean(exclude=['creator'], validate_unique=False, validate_constraints=False)
+        except ValidationError as exc:
+            errors[index] = exc.messages
+            continue
+        events.append(event)
+    return events, errors
+
+
+def embed_events(events, batch_size=None):
+    """
+    Fill in vectors for unsaved events, encoding their texts in large batches
+    """
+    batch_size = batch_size or getattr(settings, 'EVENT_IMPORT_EMBED_BATCH', 256)
+    model_id = current_model_id()
+    with_text = [event for event in events if event.embedding_text()]
+    for start in range(0, len(with_text), batch_size):
+        chunk = with_text[start:start + batch_size]
+        vectors = texts_to_vectors([event.embedding_text() for event in chunk])
+        for event, vector in zip(chunk, vectors):
+            event.vector = vector
+            event.vector_model = model_id
+    for event in events:
+        event.vector_state = VectorState.READY
+
+
+def import_events(rows, creator, batch_size=None):
+    """
+    Validate, embed and bulk-insert rows created by `creator`.
+    Returns (created_events, errors); nothing is created when errors is non-empty.
+    """
+    max_rows = getattr(settings, 'EVENT_IMPORT_MAX_ROWS', 1000)
+    if len(rows) > max_rows:
+        return [], {'non_field_errors': [f"At most {max_rows} events can be imported at once."]}
+    if not rows:
+        return [], {'non_field_errors': ["No events to import."]}
+
+    events, errors = validate_rows(rows, creator)
+    if errors:
+        return [], errors
+
+    embed_events(events, batch_size)
+    with transaction.atomic():
+        cities = city_ids.get_or_create_ids(event.city for event in events)
+        categories = category_ids.get_or_create_ids(event.category for event in events)
+        for event in events:
+            event.city_ref_id = cities[event.city]
+            event.category_ref_id = categories[event.category]
+        created = Event.objects.bulk_create(events, batch_size=500)
+        for city in {event.city for event in created}:
+            transaction.on_commit(lambda city=city: vector_index.invalidate(city))
+    return created, {}
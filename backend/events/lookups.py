@@ -0,0 +1,104 @@
+"""
+In-process name => id maps for the City and Category lookup tables.
+
+Listings resolve a city or category name once per process and then filter on the
+integer foreign key. Ids are only cached once the row they came from is committed,
+so a rolled-back insert can never leave a dangling id in the map, and a deleted row
+(e.g. from the admin) drops out of the map. Ids written into foreign keys are always
+read from the database rather than the map.
+"""
+import threading
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_delete
+
+
+def normalize_name(name):
+    """
+    Key that case and surrounding-whitespace variants of a name share
+    """
+    return (name or '').strip().upper()
+
+
+class NameMap:
+    """
+    Caches name => id for a lookup model with `name` and unique `key` fields
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._ids = {}
+        self._lock = threading.Lock()
+        post_delete.connect(self._deleted, sender=model, weak=False)
+
+    def _deleted(self, sender, instance, **kwargs):
+        with self._lock:
+            for key in [key for key, pk in self._ids.items() if pk == instance.pk]:
+                del self._ids[key]
+
+    def _remember(self, key, pk):
+        def remember():
+            with self._lock:
+                self._ids[key] = pk
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(remember)
+        else:
+            remember()
+
+    def get_id(self, name):
+        """
+        Id for name, or None if no such row exists
+        """
+        key = normalize_name(name)
+        if not key:
+            return None
+        pk = self._ids.get(key)
+        if pk is None:
+            pk = self.model.objects.filter(key=key).values_list('pk', flat=True).first()
+            if pk is not None:
+                self._remember(key, pk)
+        return pk
+
+    def get_or_create_id(self, name):
+        """
+        Id for name, creating the row (named as given) the first time a name is seen.
+        Always checked against the database: a cached id may belong to a row deleted since,
+        and saving it into a foreign key would fail.
+        """
+        key = normalize_name(name)
+        if not key:
+            return None
+        pk = self.model.objects.filter(key=key).values_list('pk', flat=True).first()
+        if pk is None:
+            try:
+                with transaction.atomic():
+                    pk = self.model.objects.create(key=key, name=name.strip()).pk
+            except IntegrityError:
+                # Created concurrently
+                pk = self.model.objects.get(key=key).pk
+        self._remember(key, pk)
+        return pk
+
+    def get_or_create_ids(self, names):
+        """
+        {name: id} for many names at once, as get_or_create_id() gives for each of them,
+        in at most three queries however many names there are
+        """
+        names = list(dict.fromkeys(names))
+        spellings = {}
+        for name in names:
+            key = normalize_name(name)
+            if key:
+                spellings.setdefault(key, name.strip())
+        ids = dict(self.model.objects.filter(key__in=spellings).values_list('key', 'pk'))
+        new = [self.model(key=key, name=name) for key, name in spellings.items() if key not in ids]
+        if new:
+            # Rows created concurrently are skipped here and read back below
+            self.model.objects.bulk_create(new, ignore_conflicts=True)
+            ids = dict(self.model.objects.filter(key__in=spellings).values_list('key', 'pk'))
+        for key, pk in ids.items():
+            self._remember(key, pk)
+        return {name: ids.get(normalize_name(name)) for name in names}
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
@@ -0,0 +1,80 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from events.models import Event
+from events.serializers import EventSerializer, serialize_event_rows
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare EventSerializer with the serialize_event_rows() fast path on generated listings. "
+        "Rows are created in a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000], help="Listing sizes to time")
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per size; the best is reported")
+
+    def _time(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        try:
+            with transaction.atomic():
+                User = get_user_model()
+                users = [User.objects.create(username=f'benchmark-{i}', email=f'benchmark-{i}@example.com')
+                         for i in range(5)]
+                start = timezone.now() + timezone.timedelta(days=1)
+                created = 0
+                for rows in sorted(options['rows']):
+                    events = [
+                        Event(
+                            title=f'Benchmark Event {i}',
+                            description='Generated for serializer benchmarking',
+                            category='Benchmark',
+                            city='Benchmark City',
+                            location='Nowhere',
+                            start_time=start + timezone.timedelta(minutes=i),
+                            end_time=start + timezone.timedelta(minutes=i + 60),
+                            capacity=5,
+                            attendance=i % 6,
+                            creator=users[0],
+                        )
+                        for i in range(created, rows)
+                    ]
+                    events = Event.objects.bulk_create(events, batch_size=1000)
+                    Event.participants.through.objects.bulk_create(
+                        [Event.participants.through(event_id=event.pk, user_id=user.pk)
+                         for event in events for user in users[:event.attendance]],
+                        batch_size=1000,
+                    )
+                    created = rows
+
+                    qs = Event.objects.for_list().filter(category='Benchmark').order_by('start_time', 'id')
+                    slow, slow_bytes = self._time(
+                        lambda: renderer.render(EventSerializer(qs.all(), many=True).data), options['repeat'])
+                    fast, fast_bytes = self._time(
+                        lambda: renderer.render(serialize_event_rows(qs.all())), options['repeat'])
+                    if slow_bytes != fast_bytes:
+                        raise CommandError(f"Outputs differ at {rows} rows")
+                    self.stdout.write(
+                        f"{rows:>7} rows  EventSerializer {slow * 1000:8.1f} ms  "
+                        f"serialize_event_rows {fast * 1000:8.1f} ms  ({slow / fast:.1f}x)"
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
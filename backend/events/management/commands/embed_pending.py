@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from events.tasks import embed_pending
+
+
+class Command(BaseCommand):
+    help = "Embed events whose vectors are still pending (EMBEDDING_ASYNC), optionally polling forever"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=64)
+        parser.add_argument('--include-failed', action='store_true', help="Retry events whose embedding failed")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new pending events")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            done = embed_pending(batch_size=options['batch_size'], include_failed=options['include_failed'])
+            if done or not options['loop']:
+                self.stdout.write(f"Embedded {done} event(s)")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
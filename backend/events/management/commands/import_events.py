@@ -0,0 +1,36 @@
+import os
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from events.importing import import_events, parse_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk import events from a CSV (with header row) or JSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSON file to import")
+        parser.add_argument('--creator', required=True, help="Username the events are created by")
+        parser.add_argument('--format', choices=['csv', 'json'], help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, help="Texts per embedding batch")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            creator = User.objects.get(username=options['creator'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user: {options['creator']}")
+
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        try:
+            with open(path, 'rb') as f:
+                rows = parse_rows(f.read(), fmt)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        created, errors = import_events(rows, creator, batch_size=options['batch_size'])
+        if errors:
+            for row, messages in errors.items():
+                self.stderr.write(f"Row {row}: {messages}")
+            raise CommandError("Import aborted, no events were created.")
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(created)} event(s)"))
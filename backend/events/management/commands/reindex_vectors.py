@@ -0,0 +1,89 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils.module_loading import import_string
+from events.models import Event, VectorState
+from events.semantic_search import current_model_id, texts_to_vectors, vector_index
+
+UPDATE_FIELDS = ['vector', 'vector_model', 'vector_state']
+
+
+_worker_backend = None
+
+
+def _init_worker(backend_path):
+    # Spawned workers use the parent's backend even if their settings would pick another
+    global _worker_backend
+    import django
+    django.setup()
+    _worker_backend = import_string(backend_path)()
+
+
+def _embed(texts):
+    if _worker_backend is not None:
+        return _worker_backend.embed(texts)
+    return texts_to_vectors(texts)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-embed events in chunks and stamp them with the current model id. "
+        "By default only rows whose vector is missing or came from another model are processed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-embed every event, not just stale ones")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows streamed and written per chunk")
+        parser.add_argument('--batch-size', type=int, default=256, help="Texts per embedding batch")
+        parser.add_argument('--workers', type=int, default=1, help="Embedding processes (1 embeds in-process)")
+
+    def handle(self, *args, **options):
+        model_id = current_model_id()
+        qs = Event.objects.only('id', 'title', 'description').order_by('pk')
+        if not options['all']:
+            qs = qs.filter(Q(vector__isnull=True) | ~Q(vector_model=model_id))
+
+        pool = None
+        if options['workers'] > 1:
+            pool = ProcessPoolExecutor(
+                max_workers=options['workers'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(settings.EMBEDDING_BACKEND,),
+            )
+        embed = pool.map if pool else map
+
+        total = 0
+        try:
+            for chunk in _chunks(qs.iterator(chunk_size=options['chunk_size']), options['chunk_size']):
+                with_text = [event for event in chunk if event.embedding_text()]
+                batches = list(_chunks(with_text, options['batch_size']))
+                texts = [[event.embedding_text() for event in batch] for batch in batches]
+                for batch, vectors in zip(batches, embed(_embed, texts)):
+                    for event, vector in zip(batch, vectors):
+                        event.vector = vector
+                        event.vector_model = model_id
+                for event in chunk:
+                    if not event.embedding_text():
+                        event.vector = None
+                        event.vector_model = ''
+                    event.vector_state = VectorState.READY
+                Event.objects.bulk_update(chunk, UPDATE_FIELDS, batch_size=500)
+                total += len(chunk)
+                self.stdout.write(f"Re-embedded {total} event(s)")
+        finally:
+            if pool:
+                pool.shutdown()
+
+        for city in Event.objects.values_list('city', flat=True).distinct():
+            vector_index.invalidate(city)
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} event(s) stamped with {model_id}"))
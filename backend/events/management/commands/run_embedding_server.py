@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+from events.embedding_server import DEFAULT_ADDRESS, make_server
+
+
+class Command(BaseCommand):
+    help = "Run the shared micro-batching embedding server used by events.embedding_server.RemoteBackend"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--address',
+            default=getattr(settings, 'EMBEDDING_SERVER_ADDRESS', DEFAULT_ADDRESS),
+            help="unix:/path/to.sock or host:port",
+        )
+        parser.add_argument(
+            '--max-batch-size', type=int,
+            default=getattr(settings, 'EMBEDDING_SERVER_MAX_BATCH', 64),
+            help="Maximum number of texts encoded in one batch",
+        )
+        parser.add_argument(
+            '--max-wait-ms', type=float,
+            default=getattr(settings, 'EMBEDDING_SERVER_MAX_WAIT_MS', 5),
+            help="How long to wait for more requests before encoding a batch",
+        )
+
+    def handle(self, *args, **options):
+        backend = import_string(settings.EMBEDDING_SERVER_BACKEND)()
+        backend.warm_up()
+        server = make_server(
+            options['address'],
+            backend,
+            max_batch_size=options['max_batch_size'],
+            max_wait=options['max_wait_ms'] / 1000,
+        )
+        self.stdout.write(f"Embedding server ({backend.model_id}) listening on {options['address']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+import events.fields
+
+
+def json_to_binary(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    rows = Event.objects.filter(vector__isnull=False).values_list('id', 'vector')
+    for pk, vector in rows.iterator(chunk_size=500):
+        if vector:
+            Event.objects.filter(pk=pk).update(vector_packed=vector)
+
+
+def binary_to_json(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    rows = Event.objects.filter(vector_packed__isnull=False).values_list('id', 'vector_packed')
+    for pk, vector in rows.iterator(chunk_size=500):
+        Event.objects.filter(pk=pk).update(vector=vector.tolist())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_alter_event_event_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='vector_packed',
+            field=events.fields.VectorField(blank=True, null=True),
+        ),
+        migrations.RunPython(json_to_binary, binary_to_json),
+        migrations.RemoveField(
+            model_name='event',
+            name='vector',
+        ),
+        migrations.RenameField(
+            model_name='event',
+            old_name='vector_packed',
+            new_name='vector',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_event_vector_binary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='vector_state',
+            field=models.CharField(choices=[('ready', 'Ready'), ('pending', 'Pending'), ('failed', 'Failed')], default='ready', max_length=10),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:31
+
+from django.db import migrations, models
+
+
+def stamp_existing_vectors(apps, schema_editor):
+    # Every vector stored so far was produced by the original SentenceTransformer model
+    Event = apps.get_model('events', 'Event')
+    Event.objects.filter(vector__isnull=False).update(vector_model='sentence-transformers/all-MiniLM-L6-v2')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_event_vector_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='vector_model',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(stamp_existing_vectors, migrations.RunPython.noop),
+    ]
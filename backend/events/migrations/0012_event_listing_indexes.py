@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:42
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_event_start_time_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(django.db.models.functions.text.Upper('city'), models.F('start_time'), models.F('id'), condition=models.Q(('cancelled', False)), name='event_city_upcoming'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(django.db.models.functions.text.Upper('category'), models.F('start_time'), models.F('id'), condition=models.Q(('cancelled', False)), name='event_category_upcoming'),
+        ),
+    ]
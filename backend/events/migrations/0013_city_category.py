@@ -0,0 +1,88 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_names(apps, schema_editor):
+    # One lookup row per case/whitespace variant group, named after its most common spelling
+    Event = apps.get_model('events', 'Event')
+    for field, model_name in (('city', 'City'), ('category', 'Category')):
+        Lookup = apps.get_model('events', model_name)
+        groups = {}
+        for row in Event.objects.values(field).annotate(n=Count('id')).order_by():
+            value = row[field]
+            key = (value or '').strip().upper()
+            if key:
+                groups.setdefault(key, []).append((-row['n'], value.strip(), value))
+        for key, variants in groups.items():
+            ref = Lookup.objects.create(key=key, name=min(variants)[1])
+            Event.objects.filter(**{f'{field}__in': [value for _, _, value in variants]}).update(
+                **{f'{field}_ref': ref}
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_event_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'categories',
+                'ordering': ['name'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'cities',
+                'ordering': ['name'],
+                'abstract': False,
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='event',
+            name='event_city_upcoming',
+        ),
+        migrations.RemoveIndex(
+            model_name='event',
+            name='event_category_upcoming',
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='category_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='events', to='events.category'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='city_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='events', to='events.city'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('cancelled', False)), fields=['city_ref', 'start_time', 'id'], name='event_city_ref_upcoming'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('cancelled', False)), fields=['category_ref', 'start_time', 'id'], name='event_category_ref_upcoming'),
+        ),
+        migrations.RunPython(merge_names, migrations.RunPython.noop),
+    ]
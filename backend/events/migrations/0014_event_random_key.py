@@ -0,0 +1,45 @@
+# Generated by Django 5.1.5 on 2026-10-18 15:47
+
+import random
+import events.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def randomize_keys(apps, schema_editor):
+    # AddField gives every existing row the same default, so draw a key per row
+    Event = apps.get_model('events', 'Event')
+    last_pk = 0
+    while True:
+        batch = list(Event.objects.filter(pk__gt=last_pk).order_by('pk').only('id')[:2000])
+        if not batch:
+            return
+        for event in batch:
+            event.random_key = random.random()
+        Event.objects.bulk_update(batch, ['random_key'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_city_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='random_key',
+            field=models.FloatField(default=events.models.new_random_key, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('cancelled', False)), fields=['random_key'], name='event_random_key'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('cancelled', False)), fields=['city_ref', 'random_key'], name='event_city_ref_random_key'),
+        ),
+        migrations.RunPython(randomize_keys, migrations.RunPython.noop),
+    ]
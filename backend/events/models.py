@@ -1,12 +1,166 @@
-from django.db import models
+import random
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, CharField, Count, F, IntegerField, Max, Prefetch, Q, Value, When
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from .semantic_search import text_to_vector
+from .semantic_search import current_model_id, text_to_vector, vector_index
+from .fields import VectorField
+from .holds import seat_holds
+from .lookups import NameMap
+from backend.conditional import make_etag
 from storages.backends.s3boto3 import S3Boto3Storage
 
 User = get_user_model()
 
+# Fields the embedding is computed from
+EMBEDDED_FIELDS = {'title', 'description'}
+# Fields that decide whether and where an event appears in the vector index
+INDEXED_FIELDS = EMBEDDED_FIELDS | {'vector', 'vector_model', 'city', 'start_time', 'cancelled'}
+
+def _seats_changed(pk):
+    # Drop the cached seat count now, and again after commit so no process keeps a pre-commit count
+    seat_holds.invalidate(pk)
+    transaction.on_commit(lambda: seat_holds.invalidate(pk))
+
+def new_random_key():
+    return random.random()
+
+class VectorState(models.TextChoices):
+    READY = 'ready', 'Ready'
+    PENDING = 'pending', 'Pending'
+    FAILED = 'failed', 'Failed'
+
+class LookupName(models.Model):
+    """
+    Canonical spelling of a name; `key` is shared by its case variants (see events.lookups)
+    """
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        abstract = True
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+class City(LookupName):
+
+    class Meta(LookupName.Meta):
+        verbose_name_plural = 'cities'
+
+class Category(LookupName):
+
+    class Meta(LookupName.Meta):
+        verbose_name_plural = 'categories'
+
+city_ids = NameMap(City)
+category_ids = NameMap(Category)
+
+class EventStatus(models.TextChoices):
+    ACTIVE = 'active', 'Active'
+    FULL = 'full', 'Full'
+    EXPIRE = 'expire', 'Expired'
+
+# Sort rank for ?ordering=status: open events first, then full, then over
+STATUS_ORDER = [EventStatus.ACTIVE, EventStatus.FULL, EventStatus.EXPIRE]
+
+class EventQuerySet(models.QuerySet):
+
+    def upcoming(self):
+        """
+        Events that haven't started and aren't cancelled (the partial indexes' predicate)
+        """
+        return self.filter(start_time__gte=timezone.now(), cancelled=False)
+
+    def in_city(self, city):
+        """
+        Case-insensitive city match resolved to an integer equality on city_ref
+        """
+        city_id = city_ids.get_id(city)
+        return self.filter(city_ref_id=city_id) if city_id is not None else self.none()
+
+    def in_category(self, category):
+        category_id = category_ids.get_id(category)
+        return self.filter(category_ref_id=category_id) if category_id is not None else self.none()
+
+    def random_sample(self, n):
+        """
+        Up to n events picked by their random_key: everything from a random point in key order,
+        wrapping around to the start if that runs out. At most two index range scans, and
+        deleted rows leave no gaps to miss.
+        """
+        pivot = random.random()
+        events = list(self.filter(random_key__gte=pivot).order_by('random_key')[:n])
+        if len(events) < n:
+            events += list(self.filter(random_key__lt=pivot).order_by('random_key')[:n - len(events)])
+        return events
+
+    def by_ids(self, ids):
+        """
+        Events with the given ids, in the order given; ids that don't exist are skipped
+        """
+        position = Case(*[When(pk=pk, then=Value(index)) for index, pk in enumerate(ids)],
+                        output_field=IntegerField())
+        return self.filter(pk__in=ids).order_by(position)
+
+    def list_etag(self, model_id=None):
+        """
+        Weak ETag value for a listing of this queryset: changes whenever a listed event is added,
+        removed, saved or embedded, or ends (its serialized status flips to 'expire').
+        Search listings pass the embedding model_id, so re-embedding onto it changes the value too.
+        Call before slicing.
+        """
+        aggregates = dict(
+            count=Count('id'),
+            ended=Count('id', filter=Q(end_time__lte=timezone.now())),
+            latest=Max('updated_at'),
+            # Background embedding doesn't touch updated_at but can move an event in search results:
+            # a vector being written moves a row out of these counts
+            unembedded=Count('id', filter=Q(vector__isnull=True)),
+            waiting=Count('id', filter=Q(vector_state__in=[VectorState.PENDING, VectorState.FAILED])),
+        )
+        if model_id is not None:
+            aggregates['current'] = Count('id', filter=Q(vector_model=model_id))
+        stats = self.order_by().aggregate(**aggregates)
+        latest = stats.pop('latest')
+        latest = latest.timestamp() if latest else 0
+        parts = (*stats.values(), f'{latest:.6f}', *([model_id] if model_id is not None else []))
+        return '-'.join(str(part) for part in parts)
+
+    def with_status(self, now=None):
+        """
+        Annotate `status` (active / full / expire) in SQL, with the rules of EventSerializer.get_status
+        """
+        if 'status' in self.query.annotations:
+            return self
+        now = now or timezone.now()
+        return self.annotate(status=Case(
+            When(end_time__lte=now, then=Value(EventStatus.EXPIRE)),
+            When(attendance__lt=F('capacity'), then=Value(EventStatus.ACTIVE)),
+            default=Value(EventStatus.FULL),
+            output_field=CharField(),
+        ))
+
+    def order_by_status(self, descending=False):
+        rank = Case(
+            *[When(status=value, then=Value(index)) for index, value in enumerate(STATUS_ORDER)],
+            output_field=IntegerField(),
+        )
+        rank = rank.desc() if descending else rank.asc()
+        return self.with_status().order_by(rank, 'start_time', 'id')
+
+    def for_list(self):
+        """
+        Everything EventSerializer reads (status included) in one query for events plus one for
+        participants, however many events are listed. The vector column is never serialized, so it isn't loaded.
+        """
+        return self.with_status().select_related('creator').defer('vector').prefetch_related(
+            Prefetch('participants', queryset=User.objects.only('id').order_by('pk'))
+        )
+
 class Event(models.Model):
     title = models.CharField(max_length=200)
     category = models.CharField(max_length=100)
@@ -19,8 +173,16 @@ class Event(models.Model):
     attendance = models.PositiveIntegerField(default=0)
     event_image = models.ImageField(upload_to='event_images/', storage=S3Boto3Storage(), null=True, blank=True)
     
-    vector = models.JSONField(null=True, blank=True)
+    vector = VectorField(null=True, blank=True)
+    vector_state = models.CharField(max_length=10, choices=VectorState.choices, default=VectorState.READY)
+    # Embedding model/version that produced `vector`
+    vector_model = models.CharField(max_length=255, blank=True, default='')
     cancelled = models.BooleanField(default=False)
+    # Uniform random sort key for random_sample()
+    random_key = models.FloatField(default=new_random_key, editable=False)
+    # Normalized copies of `city` / `category`, kept in sync on save; listings filter on these
+    city_ref = models.ForeignKey(City, null=True, blank=True, on_delete=models.PROTECT, related_name='events')
+    category_ref = models.ForeignKey(Category, null=True, blank=True, on_delete=models.PROTECT, related_name='events')
 
     creator = models.ForeignKey(
         User,
@@ -37,6 +199,31 @@ class Event(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Chronological listings and their keyset cursors (see events.pagination)
+            models.Index(fields=['start_time', 'id'], name='event_start_time_id'),
+            # Upcoming listings by city / category; match them with in_city() / in_category()
+            models.Index(
+                fields=['city_ref', 'start_time', 'id'],
+                name='event_city_ref_upcoming', condition=Q(cancelled=False),
+            ),
+            models.Index(
+                fields=['category_ref', 'start_time', 'id'],
+                name='event_category_ref_upcoming', condition=Q(cancelled=False),
+            ),
+            models.Index(
+                fields=['random_key'],
+                name='event_random_key', condition=Q(cancelled=False),
+            ),
+            models.Index(
+                fields=['city_ref', 'random_key'],
+                name='event_city_ref_random_key', condition=Q(cancelled=False),
+            ),
+        ]
+
     def clean(self):
         """
         Validate event constraints:
@@ -61,22 +248,223 @@ class Event(models.Model):
         """
         Controlled method to add a participant with capacity check
         """
-        if self.participants.count() >= self.capacity:
-            raise ValidationError(f"Event has reached its maximum capacity of {self.capacity}")
-        
-        if not self.participants.filter(pk=user.pk).exists():
-            self.participants.add(user)
-            self.attendance = self.participants.count()
-            self.save()
+        try:
+            Event.join(self.pk, user)
+        except ValidationError as exc:
+            if exc.code != 'already_joined':
+                raise
+        self.refresh_from_db(fields=['attendance', 'updated_at'])
+
+    @classmethod
+    def join(cls, pk, user):
+        """
+        Take a seat at event `pk` for user in one transaction: insert the participant row, then
+        increment attendance only while it is below capacity. Concurrent joins serialize on the
+        event row, so the event can never be overbooked.
+        Raises Event.DoesNotExist, or ValidationError with code 'full' / 'already_joined'.
+        """
+        with transaction.atomic():
+            try:
+                cls.participants.through.objects.create(event_id=pk, user_id=user.pk)
+            except IntegrityError:
+                raise ValidationError("You have already joined this event.", code='already_joined')
+            seated = cls.objects.filter(pk=pk, attendance__lt=F('capacity')).update(
+                attendance=F('attendance') + 1, updated_at=timezone.now()
+            )
+            if not seated:
+                # Raising rolls back the participant row inserted above
+                if not cls.objects.filter(pk=pk).exists():
+                    raise cls.DoesNotExist("No Event matches the given query.")
+                raise ValidationError("The event is already at full capacity.", code='full')
+            WaitlistEntry.objects.filter(event_id=pk, user_id=user.pk).delete()
+            _seats_changed(pk)
+
+    @classmethod
+    def leave(cls, pk, user):
+        """
+        Give up user's seat at event `pk` in one transaction.
+        Raises Event.DoesNotExist, or ValidationError with code 'not_participant'.
+        """
+        with transaction.atomic():
+            removed, _ = cls.participants.through.objects.filter(event_id=pk, user_id=user.pk).delete()
+            if not removed:
+                if not cls.objects.filter(pk=pk).exists():
+                    raise cls.DoesNotExist("No Event matches the given query.")
+                raise ValidationError("You are not a participant of this event.", code='not_participant')
+            cls.objects.filter(pk=pk, attendance__gt=0).update(
+                attendance=F('attendance') - 1, updated_at=timezone.now()
+            )
+            cls._promote_waitlist(pk)
+            _seats_changed(pk)
+
+    @classmethod
+    def join_waitlist(cls, pk, user):
+        """
+        Queue user for a seat at event `pk`, or seat them straight away if one is free.
+        Returns the new WaitlistEntry, or None when the user was seated.
+        Raises Event.DoesNotExist, or ValidationError with code 'already_joined' / 'already_waitlisted'.
+        """
+        with transaction.atomic():
+            # Lock the event so a concurrent leave can't free a seat between the check and the insert
+            event = cls.objects.select_for_update().only('attendance', 'capacity').get(pk=pk)
+            # Seats held in the cache belong to their holders, so only the rest count as free
+            if event.capacity - event.attendance > seat_holds.held(pk):
+                cls.join(pk, user)
+                return None
+            if cls.participants.through.objects.filter(event_id=pk, user_id=user.pk).exists():
+                raise ValidationError("You have already joined this event.", code='already_joined')
+            try:
+                with transaction.atomic():
+                    return WaitlistEntry.objects.create(event_id=pk, user=user)
+            except IntegrityError:
+                raise ValidationError("You are already on the waitlist for this event.", code='already_waitlisted')
+
+    @classmethod
+    def promote_waitlist(cls, pk):
+        """
+        Seat the first waitlisted user if a seat is free and not held, e.g. after a hold is released.
+        Returns the promoted user's id, or None.
+        """
+        with transaction.atomic():
+            if not cls.objects.select_for_update().filter(pk=pk).exists():
+                return None
+            return cls._promote_waitlist(pk)
+
+    @classmethod
+    def _promote_waitlist(cls, pk):
+        """
+        Seat the first waitlisted user while a seat is free and not held; runs inside the
+        caller's transaction, which must hold the event row lock.
+        Returns the promoted user's id, or None.
+        """
+        while True:
+            capacity, attendance = cls.objects.filter(pk=pk).values_list('capacity', 'attendance').get()
+            if capacity - attendance <= seat_holds.held(pk):
+                return None
+            # skip_locked lets concurrent leaves promote different users instead of queueing on one entry
+            entry = (WaitlistEntry.objects.select_for_update(skip_locked=True)
+                     .filter(event_id=pk).order_by('pk').first())
+            if entry is None:
+                return None
+            try:
+                cls.join(pk, User(pk=entry.user_id))
+                return entry.user_id
+            except ValidationError as exc:
+                if exc.code != 'already_joined':
+                    return None
+                entry.delete()
 
     def __str__(self):
         return self.title
 
+    # Text the stored vector was computed from; None when unknown (new or deferred)
+    _embedded_text = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'title' in field_names and 'description' in field_names:
+            instance._embedded_text = instance.embedding_text()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        reloaded = EMBEDDED_FIELDS if fields is None else EMBEDDED_FIELDS & set(fields)
+        if reloaded:
+            # The vector now matches the reloaded text, unless only part of it was reloaded
+            complete = reloaded == EMBEDDED_FIELDS and not EMBEDDED_FIELDS & self.get_deferred_fields()
+            self._embedded_text = self.embedding_text() if complete else None
+
+    def resolve_refs(self):
+        """
+        Point city_ref / category_ref at the lookup rows for the current names, creating them if new
+        """
+        self.city_ref_id = city_ids.get_or_create_id(self.city)
+        self.category_ref_id = category_ids.get_or_create_id(self.category)
+
+    def detail_validators(self):
+        """
+        (etag, last_modified) for the serialized event. The status flips to 'expire' at end_time
+        without a save, so that moment counts as a modification too.
+        """
+        expired = timezone.now() >= self.end_time
+        last_modified = max(self.updated_at, self.end_time) if expired else self.updated_at
+        return make_etag(f"{self.pk}-{self.updated_at.timestamp():.6f}-{int(expired)}"), last_modified
+
+    def embedding_text(self):
+        return f"{self.title} {self.description}".strip()
+
     def save(self, *args, **kwargs):
-        self.full_clean()
-        combined_text = f"{self.title} {self.description}".strip()
-        if combined_text:
-            self.vector = text_to_vector(combined_text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            # The lookup refs are derived from city / category below, so skip their existence queries
+            self.full_clean(exclude=['city_ref', 'category_ref'])
         else:
-            self.vector = None
+            # Narrow writes (attendance, cancellation) only validate the fields they touch
+            update_fields = set(update_fields)
+            self.clean_fields(exclude=[f.name for f in self._meta.fields if f.name not in update_fields])
+
+        if update_fields is None or update_fields & {'city', 'category'}:
+            self.resolve_refs()
+            if update_fields is not None:
+                update_fields = update_fields | {'city_ref', 'category_ref'}
+                kwargs['update_fields'] = update_fields
+
+        combined_text = None
+        if update_fields is None or update_fields & EMBEDDED_FIELDS:
+            combined_text = self.embedding_text()
+            # Only re-embed when the text changed, or a vector is missing for non-empty text
+            missing = combined_text and self.vector is None and self.vector_state != VectorState.PENDING
+            if combined_text != self._embedded_text or missing:
+                if combined_text and getattr(settings, 'EMBEDDING_ASYNC', False):
+                    # Keep any previous vector until the background worker replaces it
+                    self.vector_state = VectorState.PENDING
+                else:
+                    self.vector = text_to_vector(combined_text) if combined_text else None
+                    self.vector_model = current_model_id() if combined_text else ''
+                    self.vector_state = VectorState.READY
+                if update_fields is not None:
+                    kwargs['update_fields'] = update_fields | {'vector', 'vector_state', 'vector_model'}
+
         super().save(*args, **kwargs)
+        if update_fields is None or update_fields & {'capacity', 'attendance'}:
+            _seats_changed(self.pk)
+        if combined_text is not None:
+            self._embedded_text = combined_text
+        if update_fields is None or update_fields & INDEXED_FIELDS:
+            transaction.on_commit(lambda: vector_index.update_event(self))
+        if self.vector_state == VectorState.PENDING and combined_text is not None:
+            from .tasks import embedding_queue
+            pk = self.pk
+            transaction.on_commit(lambda: embedding_queue.enqueue(pk))
+
+    def delete(self, *args, **kwargs):
+        pk, city = self.pk, self.city
+        result = super().delete(*args, **kwargs)
+        transaction.on_commit(lambda: vector_index.remove_event(pk, city))
+        return result
+
+
+class WaitlistEntry(models.Model):
+    """
+    A user queued for a seat at a full event. Entries are served first in, first out (by pk).
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='waitlist')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['pk']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'user'], name='unique_waitlist_entry'),
+        ]
+        indexes = [
+            # Head of each event's queue is a single index probe
+            models.Index(fields=['event', 'id'], name='waitlist_event_fifo'),
+        ]
+
+    def position(self):
+        return WaitlistEntry.objects.filter(event_id=self.event_id, pk__lte=self.pk).count()
+
+    def __str__(self):
+        return f"{self.user_id} waiting for {self.event_id}"
@@ -0,0 +1,62 @@
+"""
+Keyset (cursor) pagination over events ordered by (start_time, id).
+
+A cursor is the opaque, url-safe encoding of the last event on the previous page, so
+every page is the same index range scan however deep it is, unlike OFFSET paging.
+"""
+import base64
+import json
+from datetime import datetime
+from django.conf import settings
+from django.db.models import Q
+
+
+def encode_cursor(event):
+    raw = json.dumps([event.start_time.isoformat(), event.pk]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Returns (start_time, id). Raises ValueError for anything that isn't a cursor we issued.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        start_time, pk = json.loads(raw)
+        return datetime.fromisoformat(start_time), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor parameter")
+
+
+def parse_page_size(value):
+    """
+    Page size from the query string, defaulting to EVENT_PAGE_SIZE and capped at EVENT_PAGE_SIZE_MAX
+    """
+    default = getattr(settings, 'EVENT_PAGE_SIZE', 20)
+    maximum = getattr(settings, 'EVENT_PAGE_SIZE_MAX', 100)
+    if value in (None, ''):
+        return default
+    try:
+        size = int(value)
+    except ValueError:
+        raise ValueError("Invalid page_size parameter")
+    if size < 1:
+        raise ValueError("Invalid page_size parameter")
+    return min(size, maximum)
+
+
+def keyset_page(qs, cursor=None, page_size=None):
+    """
+    One page of qs after `cursor`. Returns (events, next_cursor); next_cursor is None on the last page.
+    Raises ValueError for a bad cursor or page size.
+    """
+    size = parse_page_size(page_size)
+    qs = qs.order_by('start_time', 'id')
+    if cursor:
+        start_time, pk = decode_cursor(cursor)
+        qs = qs.filter(Q(start_time__gt=start_time) | Q(start_time=start_time, id__gt=pk))
+    # One extra row tells us whether there is a next page without a COUNT
+    events = list(qs[:size + 1])
+    if len(events) > size:
+        return events[:size], encode_cursor(events[size - 1])
+    return events, None
@@ -1,34 +1,491 @@
-import spacy
-from sentence_transformers import SentenceTransformer
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .fields import unpack_vector
+from .lookups import normalize_name
 
-nlp = spacy.load("en_core_web_sm")
+SPACY_MODEL = "en_core_web_sm"
+SENTENCE_TRANSFORMER_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
-st_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+# Models are loaded on first use so processes that never embed text don't pay for them
+_nlp = None
+_st_model = None
+_model_lock = threading.Lock()
+
+def get_nlp():
+    """
+    Return the spaCy pipeline, loading it on first use
+    """
+    global _nlp
+    if _nlp is None:
+        with _model_lock:
+            if _nlp is None:
+                import spacy
+                _nlp = spacy.load(SPACY_MODEL)
+    return _nlp
+
+def get_st_model():
+    """
+    Return the SentenceTransformer model, loading it on first use
+    """
+    global _st_model
+    if _st_model is None:
+        with _model_lock:
+            if _st_model is None:
+                from sentence_transformers import SentenceTransformer
+                _st_model = SentenceTransformer(SENTENCE_TRANSFORMER_MODEL)
+    return _st_model
 
 def preprocess_text(text):
     """
     Use spaCy to preprocess text
     """
-    doc = nlp(text.lower())
+    doc = get_nlp()(text.lower())
     tokens = [token.lemma_ for token in doc if not token.is_stop and token.is_alpha]
     return " ".join(tokens)
 
+
+class EmbeddingBackend:
+    """
+    Base class for text embedding backends, selected with settings.EMBEDDING_BACKEND.
+    Subclasses implement encode() for already preprocessed texts.
+    """
+    dimension = 384
+    model_id = ''
+
+    def preprocess(self, text):
+        return preprocess_text(text)
+
+    def encode(self, texts):
+        """
+        Return a float32 array of shape (len(texts), dimension)
+        """
+        raise NotImplementedError
+
+    def embed(self, texts):
+        return self.encode([self.preprocess(text) for text in texts])
+
+    def warm_up(self):
+        pass
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """
+    all-MiniLM-L6-v2 through sentence-transformers (PyTorch)
+    """
+    model_id = SENTENCE_TRANSFORMER_MODEL
+
+    def encode(self, texts):
+        return np.asarray(get_st_model().encode(list(texts)), dtype=np.float32)
+
+    def warm_up(self):
+        get_nlp()
+        get_st_model()
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    Quantized ONNX export of the same model run on CPU by onnxruntime.
+    Needs the optional `sentence-transformers[onnx]` extra; the file is set by EMBEDDING_ONNX_FILE.
+    """
+
+    def __init__(self):
+        self.onnx_file = getattr(settings, 'EMBEDDING_ONNX_FILE', 'onnx/model_quint8_avx2.onnx')
+        self.model_id = f"{SENTENCE_TRANSFORMER_MODEL}:{self.onnx_file}"
+        self._model = None
+        self._lock = threading.Lock()
+
+    def get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(
+                        SENTENCE_TRANSFORMER_MODEL,
+                        backend='onnx',
+                        model_kwargs={'file_name': self.onnx_file},
+                    )
+        return self._model
+
+    def encode(self, texts):
+        return np.asarray(self.get_model().encode(list(texts)), dtype=np.float32)
+
+    def warm_up(self):
+        get_nlp()
+        self.get_model()
+
+
+class HashingBackend(EmbeddingBackend):
+    """
+    Deterministic fake for tests and CI: signed feature hashing of lowercase words.
+    Needs no model; texts sharing words still get similar vectors.
+    """
+    model_id = 'hashing'
+
+    def preprocess(self, text):
+        return " ".join(re.findall(r"[a-z]+", text.lower()))
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in text.split():
+                digest = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+                sign = 1.0 if digest & 1 else -1.0
+                vectors[row, (digest >> 1) % self.dimension] += sign
+        return normalize_rows(vectors)
+
+
+_backends = {}
+
+def get_backend():
+    """
+    Return the embedding backend configured by settings.EMBEDDING_BACKEND
+    """
+    path = getattr(settings, 'EMBEDDING_BACKEND', 'events.semantic_search.SentenceTransformerBackend')
+    backend = _backends.get(path)
+    if backend is None:
+        with _model_lock:
+            backend = _backends.get(path)
+            if backend is None:
+                backend = _backends[path] = import_string(path)()
+    return backend
+
+def current_model_id():
+    """
+    Identifier of the model that produces vectors right now, stamped on Event.vector_model
+    """
+    return get_backend().model_id
+
+def warm_up():
+    """
+    Load the configured backend eagerly, e.g. from a gunicorn worker hook, so the first request doesn't pay for it
+    """
+    get_backend().warm_up()
+
 def text_to_vector(text):
     """
-    Use SentenceTransformers to vectorize text
+    Vectorize text with the configured embedding backend
+    """
+    return get_backend().embed([text])[0].tolist()
+
+def texts_to_vectors(texts):
     """
-    processed = preprocess_text(text)
-    embedding = st_model.encode([processed])
-    return embedding[0].tolist()
+    Vectorize many texts in one batch, returns a float32 array with one row per text
+    """
+    return get_backend().embed(list(texts))
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU of search query embeddings with a TTL, in front of the embedding backend.
+    Keys are the backend's model_id plus the normalized query, so a backend change never serves stale vectors.
+    Size and TTL come from QUERY_EMBEDDING_CACHE_SIZE / QUERY_EMBEDDING_CACHE_TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query):
+        return " ".join(query.lower().split())
+
+    def get(self, query):
+        """
+        Return the embedding for query, computing and caching it on a miss
+        """
+        backend = get_backend()
+        normalized = self.normalize(query)
+        key = (backend.model_id, normalized)
+        maxsize = getattr(settings, 'QUERY_EMBEDDING_CACHE_SIZE', 1024)
+        ttl = getattr(settings, 'QUERY_EMBEDDING_CACHE_TTL', 3600)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        vector = backend.embed([normalized])[0]
+        vector.flags.writeable = False
+        if maxsize > 0:
+            with self._lock:
+                self._entries[key] = (now, vector)
+                self._entries.move_to_end(key)
+                while len(self._entries) > maxsize:
+                    self._entries.popitem(last=False)
+        return vector
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+query_cache = QueryEmbeddingCache()
+
+def query_to_vector(query):
+    """
+    Vectorize a search query through the query embedding cache
+    """
+    return query_cache.get(query)
 
 def compute_similarities(query_vec, event_vecs):
     """
     Compute simiarity between query text and event text
     """
+    from sklearn.metrics.pairwise import cosine_similarity
+
     query_arr = np.array([query_vec])
-    event_arr = np.array(event_vecs)
+    event_arr = np.array([as_vector(vec) for vec in event_vecs])
 
     similarities = cosine_similarity(query_arr, event_arr)
     return similarities[0]
+
+def as_vector(vector):
+    """
+    Return a vector as an ndarray, decoding packed bytes without copying
+    """
+    if isinstance(vector, (bytes, bytearray, memoryview)):
+        return unpack_vector(vector)
+    return vector
+
+def normalize_rows(matrix):
+    """
+    L2-normalize each row of a 2D array as float32, leaving zero rows untouched
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(ids, scores, start, end):
+    """
+    Return (ids, scores) ranked [start, end) by descending score without sorting the whole array
+    """
+    negated = -scores
+    if end - start < len(scores):
+        # After partitioning at both window edges, positions start..end-1 hold exactly that rank window
+        kth = sorted({start, end - 1})
+        window = np.argpartition(negated, kth)[start:end]
+        window = window[np.argsort(negated[window], kind='stable')]
+    else:
+        window = np.argsort(negated, kind='stable')
+    return ids[window], scores[window]
+
+
+class CityVectorIndex:
+    """
+    Per-city matrix of L2-normalized event vectors, kept warm inside each worker.
+
+    A city is loaded from the database on its first query and then kept in sync
+    from Event.save()/delete(). Every write also bumps a per-city generation in
+    the Django cache so other workers sharing that cache reload on their next
+    query; entries older than VECTOR_INDEX_TTL seconds are reloaded regardless.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cities = {}
+
+    @staticmethod
+    def _key(city):
+        # The same key in_city() resolves names by, so every spelling shares one entry
+        return normalize_name(city)
+
+    @staticmethod
+    def _generation_key(key):
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        return f"vector_index:{digest}"
+
+    def _generation(self, key):
+        return cache.get(self._generation_key(key), 0)
+
+    def _bump_generation(self, key):
+        cache_key = self._generation_key(key)
+        cache.add(cache_key, 0, None)
+        try:
+            return cache.incr(cache_key)
+        except ValueError:
+            # Key evicted between add() and incr()
+            cache.set(cache_key, 1, None)
+            return 1
+
+    def _load(self, city):
+        from .models import Event, VectorState
+
+        model_id = current_model_id()
+        live = Event.objects.upcoming().in_city(city).filter(vector__isnull=False)
+        rows = live.filter(vector_model=model_id).values_list('id', 'vector')
+        ids = []
+        vectors = []
+        for pk, vector in rows:
+            if len(vector):
+                ids.append(pk)
+                vectors.append(vector)
+        if ids:
+            matrix = normalize_rows(vectors)
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+
+        # Vectors from another model are never ranked (search finds them by keyword meanwhile).
+        # With background embedding on, queue them to be re-embedded; otherwise reindex_vectors does it.
+        if getattr(settings, 'EMBEDDING_ASYNC', False) and getattr(settings, 'VECTOR_REEMBED_STALE', True):
+            stale = list(live.filter(vector_state=VectorState.READY).exclude(vector_model=model_id)
+                         .values_list('id', flat=True))
+            if stale:
+                from .tasks import embedding_queue
+                Event.objects.filter(pk__in=stale).update(vector_state=VectorState.PENDING)
+                for pk in stale:
+                    embedding_queue.enqueue(pk)
+
+        return {
+            'ids': np.array(ids, dtype=np.int64),
+            'matrix': matrix,
+            'loaded_at': time.monotonic(),
+        }
+
+    def _entry(self, city):
+        key = self._key(city)
+        generation = self._generation(key)
+        ttl = getattr(settings, 'VECTOR_INDEX_TTL', 300)
+        with self._lock:
+            entry = self._cities.get(key)
+            if (entry is not None and entry['generation'] == generation
+                    and time.monotonic() - entry['loaded_at'] < ttl):
+                return entry
+        entry = self._load(city)
+        entry['generation'] = generation
+        with self._lock:
+            self._cities[key] = entry
+        return entry
+
+    def search(self, city, query_vec, offset=0, limit=None):
+        """
+        Rank the city's events against query_vec.
+        Returns (ids, scores) by descending cosine similarity for ranks
+        [offset, offset + limit), or every rank from offset when limit is None.
+        Only the requested window is sorted.
+        """
+        entry = self._entry(city)
+        ids, matrix = entry['ids'], entry['matrix']
+        end = len(ids) if limit is None else min(offset + limit, len(ids))
+        if offset >= end:
+            return ids[:0], np.empty(0, dtype=np.float32)
+
+        query = normalize_rows(np.asarray(query_vec).reshape(1, -1))[0]
+        scores = matrix @ query
+
+        return top_k(ids, scores, offset, end)
+
+    def count(self, city):
+        """
+        Number of events the city's index currently ranks
+        """
+        return len(self._entry(city)['ids'])
+
+    def _drop_row(self, entry, pk):
+        mask = entry['ids'] != pk
+        if mask.all():
+            return
+        entry['ids'] = entry['ids'][mask]
+        entry['matrix'] = entry['matrix'][mask]
+
+    def _sync(self, pk, city, vector=None):
+        """
+        Remove event `pk` from every loaded city and, if a vector is given,
+        re-add it to `city`. Generations are bumped for every city touched.
+        """
+        current = self._key(city) if city else None
+        touched = {current} if current else set()
+        with self._lock:
+            for key, entry in self._cities.items():
+                if (entry['ids'] == pk).any():
+                    touched.add(key)
+                self._drop_row(entry, pk)
+            entry = self._cities.get(current)
+            if vector is not None and entry is not None:
+                row = normalize_rows(np.asarray(vector).reshape(1, -1))
+                if entry['matrix'].size:
+                    entry['matrix'] = np.vstack([entry['matrix'], row])
+                else:
+                    entry['matrix'] = row
+                entry['ids'] = np.append(entry['ids'], np.int64(pk))
+
+        for key in touched:
+            generation = self._bump_generation(key)
+            with self._lock:
+                entry = self._cities.get(key)
+                if entry is None:
+                    continue
+                if generation == entry['generation'] + 1:
+                    entry['generation'] = generation
+                else:
+                    # Another worker wrote to this city too, reload on next query
+                    del self._cities[key]
+
+    def update_event(self, event):
+        """
+        Keep the index in sync after an event is saved
+        """
+        live = (
+            not event.cancelled
+            and event.vector is not None
+            and len(event.vector) > 0
+            and event.vector_model == current_model_id()
+            and event.start_time >= timezone.now()
+        )
+        self._sync(event.pk, event.city, event.vector if live else None)
+
+    def remove_event(self, pk, city):
+        """
+        Keep the index in sync after an event is deleted
+        """
+        self._sync(pk, city)
+
+    def invalidate(self, city):
+        """
+        Drop a city in this worker and tell workers sharing the cache to reload it
+        """
+        key = self._key(city)
+        with self._lock:
+            self._cities.pop(key, None)
+        self._bump_generation(key)
+
+    def rebuild(self, city=None):
+        """
+        Drop cached cities (all of them, or only `city`) and reload from the database.
+        Cities other than `city` are reloaded lazily on their next query.
+        """
+        with self._lock:
+            if city is None:
+                self._cities.clear()
+                return
+            self._cities.pop(self._key(city), None)
+        self._entry(city)
+
+
+vector_index = CityVectorIndex()
+
+def rebuild_index(city=None):
+    """
+    Rebuild the in-memory vector index on demand
+    """
+    vector_index.rebuild(city)
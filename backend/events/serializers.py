@@ -1,8 +1,10 @@
 from rest_framework import serializers
+from django.db import models
 from django.utils import timezone
+from backend.sparse import SparseFieldsMixin
 from .models import Event
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     status = serializers.SerializerMethodField()
     event_image = serializers.ImageField(write_only=True, required=False)
     event_image_url = serializers.SerializerMethodField()
@@ -10,14 +12,32 @@ class EventSerializer(serializers.ModelSerializer):
     class Meta:
         model = Event
         read_only_fields = ('creator', 'created_at', 'updated_at', 'participants',)
-        exclude = ['vector']
+        exclude = ['vector', 'vector_state', 'vector_model', 'city_ref', 'category_ref', 'random_key']
+        column_sources = {
+            'status': ['end_time', 'attendance', 'capacity'],
+            'event_image_url': ['event_image'],
+        }
+
+    @classmethod
+    def narrow(cls, queryset, names, extra=()):
+        """
+        creator is serialized as its id, so narrowed querysets drop the join (and participants unless asked for)
+        """
+        if names is None:
+            return queryset
+        queryset = super().narrow(queryset, names, extra).select_related(None)
+        return queryset if 'participants' in names else queryset.prefetch_related(None)
 
     def get_status(self, obj):
         """
         1) If attendance < capacity AND now < end_time => 'active'
         2) If attendance >= capacity AND now < end_time => 'full'
         3) If now >= end_time => 'expire'
+        Querysets from Event.objects.with_status() / for_list() already carry it from SQL.
         """
+        annotated = getattr(obj, 'status', None)
+        if annotated is not None:
+            return annotated
         now = timezone.now()
         if now < obj.end_time:
             if obj.attendance < obj.capacity:
@@ -34,3 +54,66 @@ class EventSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.event_image.url)
             return obj.event_image.url
         return None
+
+
+def _datetime(value, tz):
+    # Same output as DRF's DateTimeField with the default ISO 8601 format
+    if value is None:
+        return None
+    value = value.astimezone(tz).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def serialize_event_rows(queryset, request=None, fields=None):
+    """
+    Read-only fast path for listings: the same data as EventSerializer(queryset, many=True, fields=fields).data
+    (participants in pk order, as for_list() prefetches them), built from one values_list()
+    query plus one participants query instead of model instances and DRF field objects.
+    Status comes from the with_status() SQL annotation; only the columns `fields` need are selected.
+    """
+    if fields is None:
+        fields = EventSerializer.readable_fields()
+    model_fields = {field.name: field for field in Event._meta.concrete_fields}
+    columns = ['id']
+    if 'status' in fields:
+        columns.append('status')
+    if 'event_image_url' in fields:
+        columns.append('event_image')
+    columns += [model_fields[name].attname for name in fields if name in model_fields and name not in columns]
+    rows = list(queryset.with_status().prefetch_related(None).values_list(*columns))
+
+    participants = {row[0]: [] for row in rows}
+    if 'participants' in fields and rows:
+        pairs = (Event.participants.through.objects
+                 .filter(event_id__in=participants)
+                 .order_by('user_id')
+                 .values_list('event_id', 'user_id'))
+        for event_id, user_id in pairs:
+            participants[event_id].append(user_id)
+
+    storage = model_fields['event_image'].storage
+    tz = timezone.get_current_timezone()
+    position = {column: index for index, column in enumerate(columns)}
+    getters = []
+    for name in fields:
+        if name == 'status':
+            getters.append(lambda row, index=position['status']: row[index])
+        elif name == 'event_image_url':
+            def image_url(row, index=position['event_image']):
+                if not row[index]:
+                    return None
+                url = storage.url(row[index])
+                return request.build_absolute_uri(url) if request else url
+            getters.append(image_url)
+        elif name == 'participants':
+            getters.append(lambda row: participants[row[0]])
+        elif isinstance(model_fields[name], models.DateTimeField):
+            index = position[name]
+            getters.append(lambda row, index=index: _datetime(row[index], tz))
+        else:
+            index = position[model_fields[name].attname]
+            getters.append(lambda row, index=index: row[index])
+
+    return [{name: get(row) for name, get in zip(fields, getters)} for row in rows]
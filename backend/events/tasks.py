@@ -0,0 +1,102 @@
+"""
+Background embedding for events saved with EMBEDDING_ASYNC enabled.
+
+Rows in the 'pending' vector state are the durable queue: each worker process
+drains the ids it enqueued on a daemon thread, and `manage.py embed_pending`
+sweeps anything left behind (e.g. after a restart) without an external broker.
+"""
+import logging
+import queue
+import threading
+from django.db import close_old_connections, transaction
+from .models import Event, VectorState
+from .semantic_search import current_model_id, texts_to_vectors, vector_index
+
+logger = logging.getLogger(__name__)
+
+
+def embed_pending(ids=None, batch_size=64, include_failed=False):
+    """
+    Embed pending events (optionally only `ids`) in batches. Returns the number of events embedded.
+    A row is only written if its text is unchanged since it was read, so a concurrent edit
+    keeps it pending for the next pass instead of storing a stale vector.
+    """
+    states = [VectorState.PENDING, VectorState.FAILED] if include_failed else [VectorState.PENDING]
+    qs = Event.objects.filter(vector_state__in=states).order_by('pk')
+    if ids is not None:
+        qs = qs.filter(pk__in=ids)
+
+    done = 0
+    last_pk = 0
+    while True:
+        batch = list(qs.filter(pk__gt=last_pk).only('id', 'title', 'description')[:batch_size])
+        if not batch:
+            return done
+        last_pk = batch[-1].pk
+
+        texts = [event.embedding_text() for event in batch]
+        try:
+            model_id = current_model_id()
+            vectors = texts_to_vectors(texts)
+        except Exception:
+            logger.exception("Embedding failed for events %s", [event.pk for event in batch])
+            Event.objects.filter(pk__in=[event.pk for event in batch]).update(vector_state=VectorState.FAILED)
+            continue
+
+        for event, text, vector in zip(batch, texts, vectors):
+            updated = Event.objects.filter(
+                pk=event.pk, vector_state__in=states, title=event.title, description=event.description,
+            ).update(
+                vector=vector if text else None,
+                vector_model=model_id if text else '',
+                vector_state=VectorState.READY,
+            )
+            if updated:
+                done += 1
+                transaction.on_commit(lambda pk=event.pk: _sync_index(pk))
+
+
+def _sync_index(pk):
+    event = Event.objects.filter(pk=pk).first()
+    if event is not None:
+        vector_index.update_event(event)
+
+
+class EmbeddingQueue:
+    """
+    In-process queue of event ids drained by a daemon thread in small batches
+    """
+
+    def __init__(self, batch_size=32):
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def enqueue(self, pk):
+        self._ensure_worker()
+        self._queue.put(pk)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='embedding-queue', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            ids = [self._queue.get()]
+            while len(ids) < self.batch_size:
+                try:
+                    ids.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                embed_pending(ids=ids, batch_size=self.batch_size)
+            except Exception:
+                logger.exception("Background embedding failed for events %s", ids)
+            finally:
+                close_old_connections()
+
+
+embedding_queue = EmbeddingQueue()
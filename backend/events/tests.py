@@ -1,20 +1,38 @@
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework import status
-from events.models import Event
-from events.serializers import EventSerializer
+from events.models import City, Event, VectorState, WaitlistEntry, category_ids, city_ids
+from events.lookups import NameMap
+from events.tasks import EmbeddingQueue, embed_pending
+from events.serializers import EventSerializer, serialize_event_rows
+from events.importing import import_events
+from events.fields import pack_vector, unpack_vector
+from events.holds import HOLD_SLICES, seat_holds
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from events.forms import ProfileImageForm
 from PIL import Image
 from unittest.mock import patch
-from events.semantic_search import preprocess_text, text_to_vector, compute_similarities
+from events import semantic_search
+from events.embedding_server import RemoteBackend, make_server
+from events.semantic_search import preprocess_text, text_to_vector, compute_similarities, vector_index, rebuild_index
 from unittest.mock import Mock
 import io
+import json
+import os
 import random
+import tempfile
+import threading
+import time
 import numpy as np
 import openai
 
@@ -287,6 +305,158 @@ class EventModelTestCase(TestCase):
         event.save()
         self.assertIsNone(event.vector)  # Ensure vector is None
 
+class EventEmbeddingChangeTrackingTestCase(APITestCase):
+    def setUp(self):
+        self.creator = User.objects.create(username="trackcreator", email="trackcreator@test.com")
+        self.joiner = User.objects.create(username="trackjoiner", email="trackjoiner@test.com")
+        self.event = Event.objects.create(
+            title="Tracked Event",
+            category="Test",
+            city="Test City",
+            location="Test Location",
+            description="Original description",
+            start_time=timezone.now() + timezone.timedelta(days=5),
+            end_time=timezone.now() + timezone.timedelta(days=6),
+            capacity=10,
+            creator=self.creator
+        )
+
+    @patch("events.models.text_to_vector", return_value=[0.1, 0.2, 0.3])
+    def test_unchanged_text_is_not_re_embedded(self, mock_vectorizer):
+        """Test saving an event without text changes skips the embedding model"""
+        event = Event.objects.get(pk=self.event.pk)
+        event.capacity = 20
+        event.save()
+        mock_vectorizer.assert_not_called()
+
+    @patch("events.models.text_to_vector", return_value=[0.1, 0.2, 0.3])
+    def test_changed_text_is_re_embedded(self, mock_vectorizer):
+        """Test editing the title re-embeds the event"""
+        event = Event.objects.get(pk=self.event.pk)
+        event.title = "Renamed Event"
+        event.save()
+        mock_vectorizer.assert_called_once_with("Renamed Event Original description")
+
+    @patch("events.models.text_to_vector", return_value=[0.1, 0.2, 0.3])
+    def test_text_restored_after_refresh_is_re_embedded(self, mock_vectorizer):
+        """Test refresh_from_db() tracks the reloaded text, not the text loaded before it"""
+        event = Event.objects.get(pk=self.event.pk)
+        other = Event.objects.get(pk=self.event.pk)
+        other.title = "Pottery class"
+        other.save()
+        event.refresh_from_db()
+        mock_vectorizer.reset_mock()
+
+        event.title = "Tracked Event"
+        event.save()
+        mock_vectorizer.assert_called_once_with("Tracked Event Original description")
+
+    @patch("events.models.text_to_vector", return_value=[0.1, 0.2, 0.3])
+    def test_join_leave_and_cancel_do_not_re_embed(self, mock_vectorizer):
+        """Test attendance and cancellation writes skip the embedding model"""
+        self.client.force_authenticate(user=self.joiner)
+        self.client.post(reverse('join_event', kwargs={'pk': self.event.pk}))
+        self.client.post(reverse('leave_event', kwargs={'pk': self.event.pk}))
+        self.client.force_authenticate(user=self.creator)
+        self.client.post(reverse('cancel_event', kwargs={'pk': self.event.pk}))
+        mock_vectorizer.assert_not_called()
+
+    def test_narrow_save_only_writes_given_fields(self):
+        """Test an attendance save does not overwrite concurrent edits to other columns"""
+        stale = Event.objects.get(pk=self.event.pk)
+        Event.objects.filter(pk=self.event.pk).update(title="Edited Elsewhere")
+        stale.attendance = 3
+        stale.save(update_fields=['attendance', 'updated_at'])
+        fresh = Event.objects.get(pk=self.event.pk)
+        self.assertEqual(fresh.title, "Edited Elsewhere")
+        self.assertEqual(fresh.attendance, 3)
+
+@override_settings(EMBEDDING_ASYNC=True)
+class AsyncEmbeddingTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="asyncuser", email="async@test.com")
+
+    def tearDown(self):
+        # captureOnCommitCallbacks(execute=True) caches lookup ids for rows the test rollback discards
+        city_ids.clear()
+        category_ids.clear()
+
+    def create_event(self, **kwargs):
+        data = {
+            "title": "Async Hiking Trip",
+            "category": "Outdoor",
+            "city": "Async City",
+            "location": "Trailhead",
+            "description": "A long walk in the woods",
+            "start_time": timezone.now() + timezone.timedelta(days=5),
+            "end_time": timezone.now() + timezone.timedelta(days=6),
+            "capacity": 10,
+            "creator": self.user,
+        }
+        data.update(kwargs)
+        return Event.objects.create(**data)
+
+    @patch("events.models.text_to_vector")
+    def test_save_marks_event_pending_and_enqueues_it(self, mock_vectorizer):
+        """Test an async save skips the model and queues the event after commit"""
+        with patch("events.tasks.embedding_queue.enqueue") as mock_enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                event = self.create_event()
+        mock_vectorizer.assert_not_called()
+        mock_enqueue.assert_called_once_with(event.pk)
+        event.refresh_from_db()
+        self.assertEqual(event.vector_state, VectorState.PENDING)
+        self.assertIsNone(event.vector)
+
+    def test_embed_pending_stores_vector(self):
+        """Test the worker embeds pending events and marks them ready"""
+        event = self.create_event()
+        self.assertEqual(embed_pending(), 1)
+        event.refresh_from_db()
+        self.assertEqual(event.vector_state, VectorState.READY)
+        self.assertTrue(np.allclose(event.vector, text_to_vector(event.embedding_text())))
+
+    def test_embed_pending_skips_rows_edited_meanwhile(self):
+        """Test a vector computed from stale text is not stored"""
+        event = self.create_event()
+        with patch("events.tasks.texts_to_vectors", wraps=semantic_search.texts_to_vectors) as mock_embed:
+            def edit_then_embed(texts):
+                Event.objects.filter(pk=event.pk).update(title="Edited Title")
+                return semantic_search.texts_to_vectors(texts)
+            mock_embed.side_effect = edit_then_embed
+            self.assertEqual(embed_pending(), 0)
+        event.refresh_from_db()
+        self.assertEqual(event.vector_state, VectorState.PENDING)
+
+    def test_search_falls_back_to_keywords_for_pending_events(self):
+        """Test pending events are found by keyword after the semantic hits"""
+        with self.settings(EMBEDDING_ASYNC=False):
+            embedded = self.create_event(title="Board games", description="Catan and friends")
+        pending = self.create_event()
+        self.create_event(title="Pottery class", description="Clay")
+        rebuild_index()
+        url = reverse('search_events') + "?city=Async%20City&query=hiking%20woods"
+        response = self.client.get(url)
+        self.assertEqual([e['id'] for e in response.data], [embedded.pk, pending.pk])
+
+        response = self.client.get(url + "&page=0")
+        self.assertEqual([e['id'] for e in response.data], [embedded.pk, pending.pk])
+
+    def test_queue_drains_in_background(self):
+        """Test the in-process queue hands enqueued ids to embed_pending"""
+        received = []
+        done = threading.Event()
+
+        def fake_embed_pending(ids, batch_size):
+            received.extend(ids)
+            done.set()
+
+        with patch("events.tasks.embed_pending", side_effect=fake_embed_pending):
+            embedding_queue = EmbeddingQueue()
+            embedding_queue.enqueue(42)
+            self.assertTrue(done.wait(5))
+        self.assertEqual(received, [42])
+
 class EventViewTestCase(APITestCase):
     def setUp(self):
         # Create users
@@ -552,6 +722,62 @@ class EventViewTestCase(APITestCase):
         response = self.client.post(url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_join_event_issues_two_writes(self):
+        """Test a successful join writes one insert plus one conditional update, and never counts rows"""
+        self.client.force_authenticate(user=self.user2)
+        url = reverse('join_event', kwargs={'pk': self.event.id})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        writes = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual([sql.split()[0] for sql in writes], ['INSERT', 'UPDATE'])
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT' in q['sql']])
+
+    def test_join_never_exceeds_capacity(self):
+        """Test joins past capacity fail even when capacity was checked on a stale copy"""
+        self.event.capacity = 2
+        self.event.save()
+        users = [User.objects.create(username=f"burst{i}", email=f"burst{i}@test.com") for i in range(5)]
+        stale = Event.objects.get(pk=self.event.pk)
+        results = []
+        for user in users:
+            try:
+                Event.join(stale.pk, user)
+                results.append(True)
+            except ValidationError as exc:
+                self.assertEqual(exc.code, 'full')
+                results.append(False)
+        self.assertEqual(results.count(True), 2)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendance, 2)
+        self.assertEqual(self.event.participants.count(), 2)
+
+    def test_join_full_event_rolls_back_participant(self):
+        """Test a rejected join leaves no participant row behind"""
+        self.event.capacity = 1
+        self.event.save()
+        Event.join(self.event.pk, self.user1)
+        with self.assertRaises(ValidationError):
+            Event.join(self.event.pk, self.user2)
+        self.assertFalse(self.event.participants.filter(pk=self.user2.pk).exists())
+
+    def test_join_twice_keeps_attendance(self):
+        """Test joining twice is rejected without double counting"""
+        self.client.force_authenticate(user=self.user2)
+        url = reverse('join_event', kwargs={'pk': self.event.id})
+        self.client.post(url)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], "You have already joined this event.")
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendance, 1)
+
+    def test_join_and_leave_non_existent_event(self):
+        self.client.force_authenticate(user=self.user2)
+        for name in ('join_event', 'leave_event'):
+            response = self.client.post(reverse(name, kwargs={'pk': 9999}))
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_search_events_missing_city(self):
         url = reverse('search_events')
         response = self.client.get(url)
@@ -899,6 +1125,1110 @@ class EventViewTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("error", response.data)
 
+class BulkImportTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="importer", email="importer@test.com")
+        self.client.force_authenticate(user=self.user)
+        start = timezone.now() + timezone.timedelta(days=10)
+        self.rows = [
+            {
+                'title': f'Imported Event {i}',
+                'category': 'Partner',
+                'city': 'Import City',
+                'location': 'Community Hall',
+                'description': f'Partner event number {i}',
+                'start_time': (start + timezone.timedelta(days=i)).isoformat(),
+                'end_time': (start + timezone.timedelta(days=i, hours=2)).isoformat(),
+                'capacity': 25,
+            }
+            for i in range(3)
+        ]
+
+    def test_import_json_embeds_in_one_batch(self):
+        """Test a JSON import creates every event with one batched encode"""
+        with patch("events.importing.texts_to_vectors", wraps=semantic_search.texts_to_vectors) as mock_embed:
+            response = self.client.post(reverse('bulk_import_events'), self.rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(mock_embed.call_count, 1)
+        events = Event.objects.filter(pk__in=response.data['ids'])
+        self.assertEqual(events.count(), 3)
+        for event in events:
+            self.assertEqual(event.creator, self.user)
+            self.assertEqual(event.vector.shape, (384,))
+
+    def test_import_is_all_or_nothing(self):
+        """Test one invalid row rejects the whole import"""
+        self.rows[1]['capacity'] = 0
+        self.rows[2]['end_time'] = self.rows[2]['start_time']
+        response = self.client.post(reverse('bulk_import_events'), {'events': self.rows}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data['errors']), {1, 2})
+        self.assertFalse(Event.objects.filter(city='Import City').exists())
+
+    def test_import_csv_upload(self):
+        """Test importing a CSV file upload"""
+        header = list(self.rows[0])
+        lines = [",".join(header)] + [",".join(str(row[field]) for field in header) for row in self.rows]
+        upload = SimpleUploadedFile("events.csv", "\n".join(lines).encode(), content_type="text/csv")
+        response = self.client.post(reverse('bulk_import_events'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Event.objects.filter(city='Import City').count(), 3)
+
+    def test_import_rejects_bare_json_values(self):
+        """Test a JSON body that is neither a list nor an object is a 400, not a server error"""
+        for body in ('"abc"', '42', 'null'):
+            response = self.client.post(reverse('bulk_import_events'), body, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, body)
+            self.assertEqual(response.data['error'], "Expected a list of events or a 'file' upload.")
+
+    def test_import_resolves_each_name_once(self):
+        """Test lookup refs cost the same queries for 3 rows or 50, and match single saves"""
+        counts = []
+        for n in (3, 50):
+            rows = [dict(self.rows[i % 3], city=f'import city {i % 5}', category=f'Partner {n}') for i in range(n)]
+            rows[0]['city'] = ' Import City 0 '
+            with CaptureQueriesContext(connection) as ctx:
+                created, errors = import_events(rows, self.user)
+            self.assertEqual(errors, {})
+            # The event INSERT itself may be split into batches by the database backend
+            counts.append(len([q for q in ctx.captured_queries if 'events_event' not in q['sql']]))
+        self.assertEqual(counts[0], counts[1])
+        for event in Event.objects.filter(creator=self.user):
+            self.assertEqual(event.city_ref_id, city_ids.get_or_create_id(event.city))
+            self.assertEqual(event.category_ref_id, category_ids.get_or_create_id(event.category))
+        self.assertEqual(City.objects.get(key='IMPORT CITY 0').name, 'Import City 0')
+
+    @override_settings(EVENT_IMPORT_MAX_ROWS=2)
+    def test_import_row_cap(self):
+        """Test imports larger than EVENT_IMPORT_MAX_ROWS are rejected"""
+        response = self.client.post(reverse('bulk_import_events'), self.rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_events_command(self):
+        """Test the import_events management command reads a JSON file"""
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(self.rows, f)
+        try:
+            call_command('import_events', f.name, creator=self.user.username, stdout=io.StringIO())
+        finally:
+            os.remove(f.name)
+        self.assertEqual(Event.objects.filter(city='Import City', creator=self.user).count(), 3)
+
+class ReindexVectorsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="reindexer", email="reindexer@test.com")
+        self.events = [
+            Event.objects.create(
+                title=f"Reindex Event {i}",
+                category="Test",
+                city="Reindex City",
+                location="Test Location",
+                start_time=timezone.now() + timezone.timedelta(days=5 + i),
+                end_time=timezone.now() + timezone.timedelta(days=6 + i),
+                capacity=10,
+                creator=self.user
+            )
+            for i in range(3)
+        ]
+
+    def test_saved_events_are_stamped_with_model(self):
+        """Test embedding on save records which model produced the vector"""
+        self.assertEqual(self.events[0].vector_model, semantic_search.current_model_id())
+
+    def test_reindex_only_touches_stale_rows(self):
+        """Test reindex_vectors re-embeds rows from another model and stamps them"""
+        Event.objects.filter(pk=self.events[0].pk).update(vector_model="old-model", vector=[1.0, 0.0])
+        Event.objects.filter(pk=self.events[1].pk).update(vector=None)
+        out = io.StringIO()
+        call_command('reindex_vectors', chunk_size=2, batch_size=1, stdout=out)
+        self.assertIn("Done: 2 event(s)", out.getvalue())
+        for event in Event.objects.filter(pk__in=[e.pk for e in self.events]):
+            self.assertEqual(event.vector_model, semantic_search.current_model_id())
+            self.assertTrue(np.allclose(event.vector, text_to_vector(event.embedding_text())))
+
+    def test_reindex_all(self):
+        """Test --all re-embeds every row"""
+        out = io.StringIO()
+        call_command('reindex_vectors', all=True, stdout=out)
+        self.assertIn("Done: 3 event(s)", out.getvalue())
+
+    @override_settings(EMBEDDING_ASYNC=True)
+    def test_search_ignores_and_requeues_stale_vectors(self):
+        """Test stale vectors are never ranked and, with background embedding, are queued for re-embedding"""
+        Event.objects.filter(pk=self.events[0].pk).update(vector_model="old-model")
+        with patch("events.tasks.embedding_queue.enqueue") as mock_enqueue:
+            rebuild_index("Reindex City")
+        ids, _ = vector_index.search("Reindex City", text_to_vector("Reindex Event"))
+        self.assertNotIn(self.events[0].pk, list(ids))
+        self.assertEqual(len(ids), 2)
+        mock_enqueue.assert_called_once_with(self.events[0].pk)
+        self.assertEqual(Event.objects.get(pk=self.events[0].pk).vector_state, VectorState.PENDING)
+
+    def test_stale_vectors_wait_for_reindex_without_async(self):
+        """Test loading an index writes nothing and starts no embedding when EMBEDDING_ASYNC is off"""
+        Event.objects.filter(pk=self.events[0].pk).update(vector_model="old-model")
+        with patch("events.tasks.embedding_queue.enqueue") as mock_enqueue:
+            rebuild_index("Reindex City")
+            vector_index.count("Reindex City")
+        mock_enqueue.assert_not_called()
+        self.assertEqual(Event.objects.get(pk=self.events[0].pk).vector_state, VectorState.READY)
+
+    def test_search_finds_stale_and_failed_vectors_by_keyword(self):
+        """Test rows the index can't rank still match by keyword, after every ranked hit"""
+        Event.objects.filter(pk=self.events[0].pk).update(vector_model="old-model", vector_state=VectorState.PENDING)
+        Event.objects.filter(pk=self.events[1].pk).update(vector_model="old-model", vector_state=VectorState.FAILED)
+        rebuild_index("Reindex City")
+        response = self.client.get(reverse('search_events'), {'city': 'Reindex City', 'query': 'Reindex Event'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['id'] for event in response.data],
+                         [self.events[2].pk, self.events[0].pk, self.events[1].pk])
+
+class WaitlistTestCase(APITestCase):
+    def setUp(self):
+        self.creator = User.objects.create(username="waitlisthost", email="waitlisthost@test.com")
+        self.seated = User.objects.create(username="seated", email="seated@test.com")
+        self.waiters = [User.objects.create(username=f"waiter{i}", email=f"waiter{i}@test.com") for i in range(3)]
+        self.event = Event.objects.create(
+            title="Popular Event",
+            category="Test",
+            city="Test City",
+            location="Test Location",
+            start_time=timezone.now() + timezone.timedelta(days=5),
+            end_time=timezone.now() + timezone.timedelta(days=6),
+            capacity=1,
+            creator=self.creator
+        )
+        Event.join(self.event.pk, self.seated)
+        self.url = reverse('event_waitlist', kwargs={'pk': self.event.pk})
+
+    def test_waitlist_full_event(self):
+        """Test users queue in order for a full event"""
+        for position, user in enumerate(self.waiters, start=1):
+            self.client.force_authenticate(user=user)
+            response = self.client.post(self.url)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(response.data['position'], position)
+
+    def test_waitlist_joins_when_seat_free(self):
+        """Test queueing for an event with a free seat joins it directly"""
+        Event.leave(self.event.pk, self.seated)
+        self.client.force_authenticate(user=self.waiters[0])
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.event.participants.filter(pk=self.waiters[0].pk).exists())
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_waitlist_twice_or_when_joined(self):
+        self.client.force_authenticate(user=self.waiters[0])
+        self.client.post(self.url)
+        self.assertEqual(self.client.post(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=self.seated)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], "You have already joined this event.")
+
+    def test_leave_promotes_first_waitlisted_user(self):
+        """Test a freed seat goes to the head of the waitlist in the same transaction"""
+        for user in self.waiters:
+            Event.join_waitlist(self.event.pk, user)
+        self.client.force_authenticate(user=self.seated)
+        response = self.client.post(reverse('leave_event', kwargs={'pk': self.event.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendance, 1)
+        self.assertEqual(list(self.event.participants.all()), [self.waiters[0]])
+        self.assertEqual(
+            list(WaitlistEntry.objects.filter(event=self.event).values_list('user_id', flat=True)),
+            [self.waiters[1].pk, self.waiters[2].pk],
+        )
+
+    def test_waitlist_queues_while_free_seats_are_held(self):
+        """Test a held seat is not handed to the waitlist, and the hold can still be confirmed"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        Event.leave(self.event.pk, self.seated)
+        hold_id = seat_holds.acquire(self.event.pk, self.waiters[0])
+        self.client.force_authenticate(user=self.waiters[1])
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.client.force_authenticate(user=self.waiters[0])
+        response = self.client.post(reverse('join_event', kwargs={'pk': self.event.pk}), {'hold': hold_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(self.event.participants.all()), [self.waiters[0]])
+
+    def test_leave_promotes_past_held_seats(self):
+        """Test a leave seats the waitlist only with a seat left over after live holds"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        Event.objects.filter(pk=self.event.pk).update(capacity=2)
+        seat_holds.acquire(self.event.pk, self.waiters[0])
+        Event.join_waitlist(self.event.pk, self.waiters[1])
+        Event.leave(self.event.pk, self.seated)
+        self.assertEqual(list(self.event.participants.all()), [self.waiters[1]])
+        self.assertEqual(seat_holds.available(self.event.pk), 0)
+
+    def test_released_hold_promotes_waitlist(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        Event.leave(self.event.pk, self.seated)
+        hold_id = seat_holds.acquire(self.event.pk, self.waiters[0])
+        Event.join_waitlist(self.event.pk, self.waiters[1])
+        self.client.force_authenticate(user=self.waiters[0])
+        response = self.client.delete(reverse('hold_seat', kwargs={'pk': self.event.pk}), {'hold': hold_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(self.event.participants.all()), [self.waiters[1]])
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_leave_with_empty_waitlist_frees_seat(self):
+        Event.leave(self.event.pk, self.seated)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendance, 0)
+
+    def test_leave_waitlist(self):
+        self.client.force_authenticate(user=self.waiters[0])
+        self.client.post(self.url)
+        self.assertEqual(self.client.delete(self.url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.delete(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_waitlist_non_existent_event(self):
+        self.client.force_authenticate(user=self.waiters[0])
+        response = self.client.post(reverse('event_waitlist', kwargs={'pk': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class SeatHoldTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.creator = User.objects.create(username="holdhost", email="holdhost@test.com")
+        self.users = [User.objects.create(username=f"holder{i}", email=f"holder{i}@test.com") for i in range(3)]
+        self.event = Event.objects.create(
+            title="Flash Crowd Event",
+            category="Test",
+            city="Test City",
+            location="Test Location",
+            start_time=timezone.now() + timezone.timedelta(days=5),
+            end_time=timezone.now() + timezone.timedelta(days=6),
+            capacity=2,
+            creator=self.creator
+        )
+        self.hold_url = reverse('hold_seat', kwargs={'pk': self.event.pk})
+        self.join_url = reverse('join_event', kwargs={'pk': self.event.pk})
+
+    def tearDown(self):
+        cache.clear()
+
+    def hold(self, user):
+        self.client.force_authenticate(user=user)
+        return self.client.post(self.hold_url)
+
+    def test_holds_limited_to_free_seats(self):
+        """Test only as many holds as free seats are granted, without database queries once cached"""
+        self.assertEqual(self.hold(self.users[0]).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.hold(self.users[1]).status_code, status.HTTP_201_CREATED)
+        self.client.force_authenticate(user=self.users[2])
+        with self.assertNumQueries(0):
+            self.assertEqual(seat_holds.acquire(self.event.pk, self.users[2]), None)
+
+    def test_hold_is_reused_for_same_user(self):
+        first = self.hold(self.users[0]).data['hold']
+        self.assertEqual(self.hold(self.users[0]).data['hold'], first)
+        self.assertEqual(seat_holds.available(self.event.pk), 1)
+
+    def test_confirm_hold_joins_event(self):
+        hold_id = self.hold(self.users[0]).data['hold']
+        response = self.client.post(self.join_url, {'hold': hold_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attendance, 1)
+        self.assertTrue(self.event.participants.filter(pk=self.users[0].pk).exists())
+
+    def test_confirm_with_unknown_hold_fails(self):
+        self.client.force_authenticate(user=self.users[0])
+        response = self.client.post(self.join_url, {'hold': '0:bogus'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.event.participants.exists())
+
+    def test_hold_cannot_be_confirmed_by_another_user(self):
+        hold_id = self.hold(self.users[0]).data['hold']
+        self.client.force_authenticate(user=self.users[1])
+        response = self.client.post(self.join_url, {'hold': hold_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_join_without_hold_respects_held_seats(self):
+        """Test plain joins are turned away from the cache while every seat is held"""
+        self.hold(self.users[0])
+        self.hold(self.users[1])
+        self.client.force_authenticate(user=self.users[2])
+        response = self.client.post(self.join_url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.event.participants.exists())
+
+    def test_join_without_hold_ignores_full_snapshot(self):
+        """Test a cached 'no free seats' can't turn away a plain join after a leave elsewhere"""
+        Event.join(self.event.pk, self.users[0])
+        Event.join(self.event.pk, self.users[1])
+        self.assertEqual(seat_holds.available(self.event.pk), 0)
+        # Another process's leave, which can't invalidate this process's cache
+        Event.participants.through.objects.filter(event=self.event, user=self.users[0]).delete()
+        Event.objects.filter(pk=self.event.pk).update(attendance=1)
+
+        self.client.force_authenticate(user=self.users[2])
+        response = self.client.post(self.join_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.event.participants.filter(pk=self.users[2].pk).exists())
+
+    def test_released_hold_returns_to_pool(self):
+        hold_id = self.hold(self.users[0]).data['hold']
+        self.hold(self.users[1])
+        self.client.force_authenticate(user=self.users[0])
+        response = self.client.delete(self.hold_url, {'hold': hold_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.hold(self.users[2]).status_code, status.HTTP_201_CREATED)
+
+    def test_expired_hold_returns_to_pool(self):
+        with override_settings(SEAT_HOLD_TTL=1):
+            self.hold(self.users[0])
+            self.hold(self.users[1])
+        with patch("django.core.cache.backends.locmem.time.time", return_value=time.time() + 5):
+            self.assertEqual(seat_holds.available(self.event.pk), 2)
+
+    def test_leave_frees_a_hold_slot(self):
+        Event.join(self.event.pk, self.users[0])
+        Event.join(self.event.pk, self.users[1])
+        self.assertEqual(self.hold(self.users[2]).status_code, status.HTTP_400_BAD_REQUEST)
+        Event.leave(self.event.pk, self.users[0])
+        self.assertEqual(self.hold(self.users[2]).status_code, status.HTTP_201_CREATED)
+
+    def test_hold_non_existent_event(self):
+        self.client.force_authenticate(user=self.users[0])
+        response = self.client.post(reverse('hold_seat', kwargs={'pk': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_plain_join_leaves_live_holds_counted(self):
+        """Test a join without a hold can't free up a seat that is still held"""
+        hold_id = self.hold(self.users[0]).data['hold']
+        Event.join(self.event.pk, self.users[1])
+        self.assertEqual(self.hold(self.users[2]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=self.users[0])
+        response = self.client.post(self.join_url, {'hold': hold_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_confirmed_hold_stops_counting(self):
+        """Test a confirmed hold is counted once, in attendance, and not again as a hold"""
+        self.event.capacity = 3
+        self.event.save()
+        hold_id = self.hold(self.users[0]).data['hold']
+        self.client.post(self.join_url, {'hold': hold_id}, format='json')
+        self.assertEqual(seat_holds.available(self.event.pk), 2)
+        self.assertEqual(self.hold(self.users[1]).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.hold(self.users[2]).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(seat_holds.available(self.event.pk), 0)
+
+    def test_cache_traffic_does_not_grow_with_capacity(self):
+        self.event.capacity = 5000
+        self.event.save()
+        with patch("events.holds.cache.get_many", wraps=cache.get_many) as get_many:
+            self.hold(self.users[0])
+            self.assertEqual(seat_holds.available(self.event.pk), 4999)
+        self.assertLessEqual(max(len(call.args[0]) for call in get_many.call_args_list), HOLD_SLICES + 2)
+
+class QueryCountMixin:
+    """
+    assertConstantQueries(url, add_events) checks an endpoint issues the same number of
+    queries however many events it returns. add_events(n) must create n more matching events.
+    """
+
+    def assertConstantQueries(self, url, add_events, params=None, sizes=(1, 6)):
+        counts = []
+        returned = []
+        for n in sizes:
+            add_events(n)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            counts.append(len(ctx.captured_queries))
+            returned.append(len(response.data))
+        self.assertLess(returned[0], returned[-1], "add_events() did not grow the response")
+        self.assertEqual(
+            len(set(counts)), 1,
+            f"{url} issued {counts} queries for {returned} events",
+        )
+
+class ListQueryCountTestCase(QueryCountMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="lister", email="lister@test.com")
+        self.others = [User.objects.create(username=f"guest{i}", email=f"guest{i}@test.com") for i in range(3)]
+        self.client.force_authenticate(user=self.user)
+        self.created = 0
+
+    def add_events(self, n, creator=None, join=False):
+        for _ in range(n):
+            self.created += 1
+            event = Event.objects.create(
+                title=f"Listed Event {self.created}",
+                description="Board games night",
+                category="Games",
+                city="Query City",
+                location="Test Location",
+                start_time=timezone.now() + timezone.timedelta(days=self.created),
+                end_time=timezone.now() + timezone.timedelta(days=self.created + 1),
+                capacity=10,
+                creator=creator or self.user
+            )
+            event.participants.add(*self.others)
+            if join:
+                event.participants.add(self.user)
+        rebuild_index()
+
+    def test_list_user_created_events(self):
+        self.assertConstantQueries(reverse('list_user_created_events'), self.add_events)
+
+    def test_list_user_joined_events(self):
+        host = self.others[0]
+        self.assertConstantQueries(
+            reverse('list_user_joined_events'),
+            lambda n: self.add_events(n, creator=host, join=True),
+        )
+
+    def test_random_events(self):
+        # A zero pivot keeps the sample to one range scan whatever keys the events drew
+        with patch("events.models.random.random", return_value=0.0):
+            self.assertConstantQueries(reverse('random_events'), self.add_events)
+
+    def test_filter_events(self):
+        self.assertConstantQueries(reverse('filter_events'), self.add_events, {'key': 'city', 'name': 'Query City'})
+
+    def test_search_events(self):
+        self.assertConstantQueries(reverse('search_events'), self.add_events, {'city': 'Query City'})
+
+    def test_semantic_search_events(self):
+        self.assertConstantQueries(
+            reverse('search_events'), self.add_events, {'city': 'Query City', 'query': 'board games'},
+        )
+
+    def test_participants_serialized_in_pk_order(self):
+        self.add_events(1)
+        response = self.client.get(reverse('list_user_created_events'))
+        self.assertEqual(response.data[0]['participants'], [user.pk for user in self.others])
+
+class CursorPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="pager", email="pager@test.com")
+        start = timezone.now() + timezone.timedelta(days=3)
+        self.events = []
+        for i in range(7):
+            self.events.append(Event.objects.create(
+                title=f"Paged Event {i}",
+                category="Music",
+                city="Cursor City",
+                location="Test Location",
+                # Pairs share a start time so the id tiebreak is exercised
+                start_time=start + timezone.timedelta(hours=i // 2),
+                end_time=start + timezone.timedelta(days=1),
+                capacity=10,
+                creator=self.user
+            ))
+
+    def walk(self, url, params):
+        seen = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(event['id'] for event in response.data['results'])
+            if response.data['next'] is None:
+                return seen
+            response = self.client.get(url, {**params, 'cursor': response.data['next']})
+
+    def test_filter_events_walks_every_page_once(self):
+        seen = self.walk(reverse('filter_events'), {'key': 'city', 'name': 'Cursor City', 'page_size': 2})
+        self.assertEqual(seen, [event.pk for event in self.events])
+
+    def test_search_events_walks_every_page_once(self):
+        seen = self.walk(reverse('search_events'), {'city': 'Cursor City', 'page_size': 3})
+        self.assertEqual(seen, [event.pk for event in self.events])
+
+    def test_page_size_is_capped(self):
+        with override_settings(EVENT_PAGE_SIZE_MAX=4):
+            response = self.client.get(reverse('search_events'), {'city': 'Cursor City', 'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 4)
+
+    def test_invalid_cursor_and_page_size(self):
+        url = reverse('search_events')
+        self.assertEqual(self.client.get(url, {'city': 'Cursor City', 'cursor': 'not-a-cursor'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'city': 'Cursor City', 'page_size': 0}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_legacy_responses_unchanged(self):
+        """Test requests without cursor or page_size still get a plain list"""
+        response = self.client.get(reverse('filter_events'), {'key': 'city', 'name': 'Cursor City'})
+        self.assertEqual([event['id'] for event in response.data], [event.pk for event in self.events])
+        response = self.client.get(reverse('search_events'), {'city': 'Cursor City', 'page': 0})
+        self.assertEqual(len(response.data), 7)
+
+    def test_cursor_page_query_count_constant(self):
+        """Test deep pages cost the same as the first one"""
+        url = reverse('search_events')
+        first = self.client.get(url, {'city': 'Cursor City', 'page_size': 2})
+        with CaptureQueriesContext(connection) as first_ctx:
+            self.client.get(url, {'city': 'Cursor City', 'page_size': 2})
+        with CaptureQueriesContext(connection) as deep_ctx:
+            self.client.get(url, {'city': 'Cursor City', 'page_size': 2, 'cursor': first.data['next']})
+        self.assertEqual(len(first_ctx.captured_queries), len(deep_ctx.captured_queries))
+        self.assertNotIn('OFFSET', deep_ctx.captured_queries[0]['sql'])
+
+class ListingIndexTestCase(TestCase):
+    """
+    EXPLAIN the listing queries to check they are served by the partial city / category indexes
+    """
+
+    def setUp(self):
+        user = User.objects.create(username="indexer", email="indexer@test.com")
+        start = timezone.now() + timezone.timedelta(days=2)
+        events = [
+            Event(
+                title=f"Indexed Event {i}",
+                category=random.choice(["Food", "Music", "Outdoor"]),
+                city=random.choice(["Waterloo", "Toronto", "Ottawa", "Kitchener"]),
+                location="Test Location",
+                start_time=start + timezone.timedelta(hours=i),
+                end_time=start + timezone.timedelta(hours=i + 2),
+                capacity=10,
+                cancelled=i % 10 == 0,
+                creator=user,
+            )
+            for i in range(200)
+        ]
+        for event in events:
+            event.resolve_refs()
+        Event.objects.bulk_create(events)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('ANALYZE events_event')
+            elif connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, qs, index_name):
+        plan = qs.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_city_listing_uses_city_index(self):
+        self.assertUsesIndex(
+            Event.objects.upcoming().in_city("waterloo").order_by('start_time', 'id'),
+            'event_city_ref_upcoming',
+        )
+
+    def test_category_listing_uses_category_index(self):
+        self.assertUsesIndex(
+            Event.objects.upcoming().in_category("food").order_by('start_time', 'id'),
+            'event_category_ref_upcoming',
+        )
+
+    def test_in_city_is_case_insensitive(self):
+        upcoming = Event.objects.upcoming()
+        self.assertEqual(
+            set(upcoming.in_city("wAtErLoO").values_list('id', flat=True)),
+            set(upcoming.filter(city__iexact="Waterloo").values_list('id', flat=True)),
+        )
+
+class CityCategoryLookupTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="lookupuser", email="lookupuser@test.com")
+
+    def create_event(self, city, category="Food"):
+        return Event.objects.create(
+            title="Lookup Event",
+            category=category,
+            city=city,
+            location="Test Location",
+            start_time=timezone.now() + timezone.timedelta(days=2),
+            end_time=timezone.now() + timezone.timedelta(days=3),
+            capacity=10,
+            creator=self.user
+        )
+
+    def test_case_variants_share_one_row(self):
+        first = self.create_event("Waterloo", "Food")
+        second = self.create_event(" waterloo ", "FOOD")
+        self.assertEqual(first.city_ref_id, second.city_ref_id)
+        self.assertEqual(first.category_ref_id, second.category_ref_id)
+        self.assertEqual(City.objects.get().name, "Waterloo")
+        self.assertEqual(second.city, " waterloo ")
+
+    def test_city_change_updates_ref(self):
+        event = self.create_event("Waterloo")
+        event.city = "Toronto"
+        event.save(update_fields=['city', 'updated_at'])
+        event.refresh_from_db()
+        self.assertEqual(event.city_ref.name, "Toronto")
+
+    def test_filter_by_city_is_integer_equality(self):
+        event = self.create_event("Waterloo")
+        self.create_event("Toronto")
+        with CaptureQueriesContext(connection) as ctx:
+            ids = list(Event.objects.in_city("WATERLOO").values_list('id', flat=True))
+        self.assertEqual(ids, [event.pk])
+        self.assertIn('"city_ref_id" =', ctx.captured_queries[-1]['sql'])
+        self.assertNotIn('UPPER', ctx.captured_queries[-1]['sql'])
+
+    def test_unknown_city_matches_nothing(self):
+        self.create_event("Waterloo")
+        self.assertFalse(Event.objects.in_city("Atlantis").exists())
+
+    def test_name_map_caches_committed_ids(self):
+        city_id = City.objects.create(key="KITCHENER", name="Kitchener").pk
+        name_map = NameMap(City)
+        with patch("events.lookups.transaction.get_connection") as get_connection:
+            get_connection.return_value.in_atomic_block = False
+            self.assertEqual(name_map.get_id("kitchener"), city_id)
+        with self.assertNumQueries(0):
+            self.assertEqual(name_map.get_id("Kitchener "), city_id)
+
+    def test_deleted_row_leaves_the_name_map(self):
+        """Test a lookup row deleted (e.g. in the admin) is no longer served from the map"""
+        city = City.objects.create(key="ATLANTIS", name="Atlantis")
+        name_map = NameMap(City)
+        with patch("events.lookups.transaction.get_connection") as get_connection:
+            get_connection.return_value.in_atomic_block = False
+            name_map.get_id("Atlantis")
+        City.objects.filter(pk=city.pk).delete()
+        self.assertIsNone(name_map.get_id("Atlantis"))
+
+    def test_save_never_uses_a_stale_cached_id(self):
+        """Test an event can be saved in a city whose cached lookup row was deleted"""
+        with patch("events.lookups.transaction.get_connection") as get_connection:
+            get_connection.return_value.in_atomic_block = False
+            dead_id = city_ids.get_or_create_id("Atlantis")
+        self.addCleanup(city_ids.clear)
+        City.objects.filter(pk=dead_id).update(key="ATLANTIS-OLD")
+        event = self.create_event("Atlantis")
+        self.assertNotEqual(event.city_ref_id, dead_id)
+        self.assertEqual(event.city_ref.name, "Atlantis")
+
+    def test_name_map_defers_caching_inside_transactions(self):
+        City.objects.create(key="GUELPH", name="Guelph")
+        name_map = NameMap(City)
+        name_map.get_id("Guelph")
+        with self.assertNumQueries(1):
+            name_map.get_id("Guelph")
+
+class RandomSampleTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="sampler", email="sampler@test.com")
+        self.events = [self.create_event(f"Sampled Event {i}", "Waterloo" if i % 2 else "Toronto") for i in range(30)]
+
+    def create_event(self, title, city, **kwargs):
+        data = dict(
+            title=title,
+            category="Test",
+            city=city,
+            location="Test Location",
+            start_time=timezone.now() + timezone.timedelta(days=5),
+            end_time=timezone.now() + timezone.timedelta(days=6),
+            capacity=10,
+            creator=self.user,
+        )
+        data.update(kwargs)
+        return Event.objects.create(**data)
+
+    def test_always_returns_twenty_despite_id_gaps(self):
+        """Test deleted rows don't shrink the sample"""
+        for event in self.events[::3]:
+            event.delete()
+        for _ in range(5):
+            response = self.client.get(reverse('random_events'))
+            self.assertEqual(len(response.data), 20)
+            self.assertEqual(len({event['id'] for event in response.data}), 20)
+
+    def test_skips_cancelled_and_past_events(self):
+        Event.objects.exclude(pk=self.events[0].pk).update(cancelled=True)
+        past = self.create_event("Past Event", "Waterloo")
+        Event.objects.filter(pk=past.pk).update(start_time=timezone.now() - timezone.timedelta(days=1))
+        response = self.client.get(reverse('random_events'))
+        self.assertEqual([event['id'] for event in response.data], [self.events[0].pk])
+
+    def test_city_scoping(self):
+        response = self.client.get(reverse('random_events'), {'city': 'waterloo'})
+        self.assertEqual(len(response.data), 15)
+        self.assertEqual({event['city'] for event in response.data}, {"Waterloo"})
+
+    def test_sample_wraps_around(self):
+        """Test a pivot above every key still fills the sample from the start of the key order"""
+        with patch("events.models.random.random", return_value=0.9999999):
+            events = Event.objects.upcoming().random_sample(20)
+        self.assertEqual(len(events), 20)
+
+    def test_bounded_queries(self):
+        """Test a wrapped sample is two event queries plus one participants prefetch"""
+        with self.assertNumQueries(3):
+            with patch("events.models.random.random", return_value=0.9999999):
+                list(Event.objects.for_list().upcoming().random_sample(20))
+
+class ConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="etaguser", email="etaguser@test.com")
+        self.other = User.objects.create(username="etagjoiner", email="etagjoiner@test.com")
+        self.client.force_authenticate(user=self.user)
+        self.event = Event.objects.create(
+            title="Cached Event",
+            category="Test",
+            city="Etag City",
+            location="Test Location",
+            start_time=timezone.now() + timezone.timedelta(days=5),
+            end_time=timezone.now() + timezone.timedelta(days=6),
+            capacity=10,
+            creator=self.user
+        )
+        self.url = reverse('event_detail', kwargs={'pk': self.event.pk})
+
+    def test_event_detail_not_modified(self):
+        """Test a matching If-None-Match is answered with 304 without serializing"""
+        response = self.client.get(self.url)
+        self.assertIn('Last-Modified', response)
+        with patch("events.views.EventSerializer.to_representation") as mock_serialize:
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        mock_serialize.assert_not_called()
+
+    def test_event_detail_if_modified_since(self):
+        response = self.client.get(self.url)
+        cached = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_event_etag_changes_on_join(self):
+        etag = self.client.get(self.url)['ETag']
+        Event.join(self.event.pk, self.other)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['attendance'], 1)
+
+    def test_event_etag_changes_when_event_ends(self):
+        """Test the serialized status flipping to 'expire' invalidates the ETag"""
+        etag = self.client.get(self.url)['ETag']
+        later = timezone.now() + timezone.timedelta(days=7)
+        with patch("events.models.timezone.now", return_value=later), \
+                patch("events.serializers.timezone.now", return_value=later):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'expire')
+
+    def test_list_weak_etag(self):
+        """Test list endpoints answer 304 until an event in the listing changes"""
+        url = reverse('filter_events')
+        params = {'key': 'city', 'name': 'Etag City'}
+        etag = self.client.get(url, params)['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+        self.event.title = "Renamed Event"
+        self.event.save()
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['title'], "Renamed Event")
+
+    def test_list_etag_changes_on_delete(self):
+        url = reverse('list_user_created_events')
+        etag = self.client.get(url)['ETag']
+        self.event.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_search_etag(self):
+        url = reverse('search_events')
+        etag = self.client.get(url, {'city': 'Etag City'})['ETag']
+        response = self.client.get(url, {'city': 'Etag City'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_search_etag_changes_when_vectors_are_rewritten(self):
+        """Test background embedding and reindex_vectors, which leave updated_at alone, change the search ETag"""
+        url = reverse('search_events')
+        params = {'city': 'Etag City', 'query': 'cached'}
+        Event.objects.filter(pk=self.event.pk).update(vector_state=VectorState.PENDING)
+        etag = self.client.get(url, params)['ETag']
+        Event.objects.filter(pk=self.event.pk).update(vector=[1.0, 0.0], vector_state=VectorState.READY)
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        Event.objects.filter(pk=self.event.pk).update(vector_model="old-model")
+        etag = self.client.get(url, params)['ETag']
+        call_command('reindex_vectors', stdout=io.StringIO())
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class FastListSerializerTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="fastlister", email="fastlister@test.com")
+        self.guests = [User.objects.create(username=f"fastguest{i}", email=f"fastguest{i}@test.com") for i in range(3)]
+        now = timezone.now()
+        self.events = [
+            Event.objects.create(
+                title=f"Fast Event {i}",
+                description="" if i % 2 else "Some details",
+                category="Test",
+                city="Fast City",
+                location="Test Location",
+                start_time=now + timezone.timedelta(days=i + 1),
+                end_time=now + timezone.timedelta(days=i + 2),
+                capacity=2,
+                cancelled=i == 3,
+                creator=self.user
+            )
+            for i in range(5)
+        ]
+        self.events[0].participants.add(*self.guests[:2])
+        Event.objects.filter(pk=self.events[0].pk).update(attendance=2)
+        self.events[1].participants.add(self.guests[2])
+        # Expired, with a stored image name
+        Event.objects.filter(pk=self.events[2].pk).update(
+            end_time=now - timezone.timedelta(hours=1), event_image="event_images/party.jpg",
+        )
+
+    def assertSameJSON(self, qs, request=None):
+        renderer = JSONRenderer()
+        context = {'request': request} if request else {}
+        with patch("django.utils.timezone.now", return_value=timezone.now()):
+            expected = renderer.render(EventSerializer(qs.all(), many=True, context=context).data)
+            actual = renderer.render(serialize_event_rows(qs.all(), request=request))
+        self.assertEqual(actual, expected)
+
+    def test_matches_event_serializer_bytes(self):
+        """Test the fast path renders byte-identical JSON for every status, image and participant case"""
+        self.assertSameJSON(Event.objects.for_list().order_by('start_time', 'id'))
+
+    def test_matches_with_request(self):
+        request = APIRequestFactory().get('/api/events/filter/')
+        self.assertSameJSON(Event.objects.for_list().order_by('id'), request=Request(request))
+
+    def test_sliced_queryset(self):
+        self.assertSameJSON(Event.objects.for_list().order_by('start_time', 'id')[1:3])
+
+    def test_two_queries(self):
+        with self.assertNumQueries(2):
+            serialize_event_rows(Event.objects.for_list())
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command('benchmark_serializers', rows=[20, 50], repeat=1, stdout=out)
+        self.assertIn("50 rows", out.getvalue())
+        self.assertFalse(Event.objects.filter(category='Benchmark').exists())
+
+class EventStatusTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="statususer", email="statususer@test.com")
+        now = timezone.now()
+
+        def make(title, days, capacity=2, attendance=0, ended=False):
+            event = Event.objects.create(
+                title=title,
+                description="Status test",
+                category="Test",
+                city="Status City",
+                location="Test Location",
+                start_time=now + timezone.timedelta(days=days),
+                end_time=now + timezone.timedelta(days=days + 1),
+                capacity=capacity,
+                creator=self.user
+            )
+            changes = {'attendance': attendance}
+            if ended:
+                changes.update(start_time=now - timezone.timedelta(days=days + 1),
+                               end_time=now - timezone.timedelta(days=days))
+            Event.objects.filter(pk=event.pk).update(**changes)
+            return event
+
+        self.full = make("Full Event", 1, attendance=2)
+        self.active = make("Active Event", 2)
+        self.later_active = make("Later Active Event", 3, attendance=1)
+        self.expired = make("Expired Event", 1, ended=True)
+
+    def filter_titles(self, query):
+        response = self.client.get(reverse('filter_events') + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [event['title'] for event in response.data]
+
+    def test_annotation_matches_get_status(self):
+        """Test the SQL status annotation agrees with EventSerializer.get_status"""
+        serializer = EventSerializer()
+        for event in Event.objects.with_status():
+            plain = Event.objects.get(pk=event.pk)
+            self.assertEqual(event.status, serializer.get_status(plain))
+        statuses = dict(Event.objects.with_status().values_list('title', 'status'))
+        self.assertEqual(statuses, {
+            "Full Event": "full", "Active Event": "active",
+            "Later Active Event": "active", "Expired Event": "expire",
+        })
+
+    def test_filter_by_status(self):
+        """Test status=active/full/expire filter on the annotation"""
+        self.assertEqual(self.filter_titles("?key=status&name=active"), ["Active Event", "Later Active Event"])
+        self.assertEqual(self.filter_titles("?key=status&name=FULL"), ["Full Event"])
+        self.assertEqual(self.filter_titles("?key=status&name=expire&key=city&name=status city"), ["Expired Event"])
+
+    def test_filter_by_unknown_status(self):
+        response = self.client.get(reverse('filter_events') + "?key=status&name=sold")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering_by_status(self):
+        """Test ordering=status lists active before full, then by start time; -status reverses the rank"""
+        self.assertEqual(self.filter_titles("?key=city&name=Status City&ordering=status"),
+                         ["Active Event", "Later Active Event", "Full Event"])
+        self.assertEqual(self.filter_titles("?key=city&name=Status City&ordering=-status"),
+                         ["Full Event", "Active Event", "Later Active Event"])
+
+    def test_invalid_ordering(self):
+        url = reverse('filter_events') + "?key=city&name=Status City"
+        self.assertEqual(self.client.get(url + "&ordering=title").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url + "&ordering=status&page_size=2").status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+
+class SparseFieldsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="sparseuser", email="sparseuser@test.com")
+        self.guest = User.objects.create(username="sparseguest", email="sparseguest@test.com")
+        self.client.force_authenticate(user=self.user)
+        self.events = [
+            Event.objects.create(
+                title=f"Sparse Event {i}",
+                description="A long description nobody asked for",
+                category="Test",
+                city="Sparse City",
+                location="Test Location",
+                start_time=timezone.now() + timezone.timedelta(days=i + 1),
+                end_time=timezone.now() + timezone.timedelta(days=i + 2),
+                capacity=10,
+                creator=self.user
+            )
+            for i in range(3)
+        ]
+        self.events[0].participants.add(self.guest)
+        self.filter_url = reverse('filter_events') + "?key=city&name=Sparse City"
+
+    def test_fields_narrow_output_and_columns(self):
+        """Test ?fields= returns only those keys and selects only the columns they need"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.filter_url + "&fields=title,start_time,event_image_url")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0], {
+            "title": "Sparse Event 0",
+            "start_time": response.data[0]["start_time"],
+            "event_image_url": None,
+        })
+        listing_sql = ctx.captured_queries[-1]['sql']
+        self.assertNotIn('"description"', listing_sql)
+        # No participants query when participants aren't requested
+        self.assertFalse(any('events_event_participants' in query['sql'] for query in ctx.captured_queries))
+
+    def test_exclude(self):
+        response = self.client.get(self.filter_url + "&exclude=description,participants")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("description", response.data[0])
+        self.assertNotIn("participants", response.data[0])
+        self.assertEqual(response.data[0]["status"], "active")
+
+    def test_invalid_fields(self):
+        """Test unknown names, write-only fields and fields with exclude are rejected"""
+        for query in ("&fields=title,secret", "&fields=event_image", "&fields=title&exclude=description"):
+            response = self.client.get(self.filter_url + query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+            self.assertIn("error", response.data)
+
+    def test_matches_event_serializer(self):
+        """Test the fast path and EventSerializer agree on a field subset"""
+        fields = ["id", "title", "status", "participants"]
+        qs = Event.objects.for_list().order_by('start_time', 'id')
+        expected = EventSerializer(EventSerializer.narrow(qs, fields), many=True, fields=fields).data
+        self.assertEqual(serialize_event_rows(qs, fields=fields), expected)
+        self.assertEqual(expected[0]["participants"], [self.guest.pk])
+
+    def test_event_detail_fields(self):
+        url = reverse('event_detail', kwargs={'pk': self.events[0].pk})
+        response = self.client.get(url + "?fields=id,status,participants")
+        self.assertEqual(response.data, {"id": self.events[0].pk, "status": "active", "participants": [self.guest.pk]})
+        self.assertEqual(self.client.get(url + "?fields=nope").status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_pages_with_fields(self):
+        """Test keyset pages still hand out a cursor when start_time isn't serialized"""
+        response = self.client.get(self.filter_url + "&fields=id&page_size=2")
+        self.assertEqual(response.data["results"], [{"id": event.pk} for event in self.events[:2]])
+        following = self.client.get(self.filter_url + f"&fields=id&page_size=2&cursor={response.data['next']}")
+        self.assertEqual(following.data, {"results": [{"id": self.events[2].pk}], "next": None})
+
+    def test_other_listings_accept_fields(self):
+        for url in (reverse('random_events'), reverse('search_events') + "?city=Sparse City",
+                    reverse('list_user_created_events')):
+            separator = '&' if '?' in url else '?'
+            response = self.client.get(url + separator + "fields=id,title")
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertEqual(len(response.data), 3, url)
+            self.assertEqual(set(response.data[0]), {"id", "title"}, url)
+
+
+class BatchEventsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="batchuser", email="batchuser@test.com")
+        self.guest = User.objects.create(username="batchguest", email="batchguest@test.com")
+        self.events = [
+            Event.objects.create(
+                title=f"Batch Event {i}",
+                category="Test",
+                city="Batch City",
+                location="Test Location",
+                start_time=timezone.now() + timezone.timedelta(days=i + 1),
+                end_time=timezone.now() + timezone.timedelta(days=i + 2),
+                capacity=10,
+                creator=self.user
+            )
+            for i in range(6)
+        ]
+        self.events[2].participants.add(self.guest)
+        self.url = reverse('batch_events')
+
+    def get_ids(self, ids, **params):
+        return self.client.get(self.url, {"ids": ",".join(str(pk) for pk in ids), **params})
+
+    def test_returns_events_in_requested_order(self):
+        """Test events come back in the order asked for, once each, without ids that don't exist"""
+        first, second, third = self.events[3].pk, self.events[0].pk, self.events[2].pk
+        response = self.get_ids([first, 999999, second, first, third])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event["id"] for event in response.data], [first, second, third])
+        self.assertEqual(response.data[2]["participants"], [self.guest.pk])
+        self.assertEqual(response.data[0], EventSerializer(Event.objects.with_status().get(pk=first)).data)
+
+    def test_query_count_does_not_grow(self):
+        counts = []
+        for ids in ([self.events[0].pk], [event.pk for event in self.events]):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.get_ids(ids)
+            self.assertEqual(len(response.data), len(ids))
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_fields_and_conditional_get(self):
+        response = self.get_ids([self.events[1].pk], fields="id,title")
+        self.assertEqual(response.data, [{"id": self.events[1].pk, "title": "Batch Event 1"}])
+        cached = self.client.get(self.url, {"ids": str(self.events[1].pk), "fields": "id,title"},
+                                 HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(EVENT_BATCH_MAX=3)
+    def test_batch_size_is_capped(self):
+        response = self.get_ids([event.pk for event in self.events[:4]])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "At most 3 ids per request")
+        # Repeats don't count towards the cap
+        self.assertEqual(self.get_ids([self.events[0].pk] * 5).status_code, status.HTTP_200_OK)
+
+    def test_invalid_ids(self):
+        for ids in ("", "1,x", ",,", "9223372036854775808", "1,-9223372036854775809"):
+            response = self.client.get(self.url, {"ids": ids})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, ids)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class EventFormTestCase(TestCase):
     def setUp(self):
         self.user = User.objects.create(username="testuser", email="test@example.com")
@@ -958,6 +2288,46 @@ class SemanticSearchTestCase(TestCase):
         vector = text_to_vector("")
         self.assertEqual(len(vector), 384)  # Should still return a valid vector
 
+    def test_models_are_loaded_lazily_and_once(self):
+        """Test get_nlp/get_st_model load on first use and then reuse the instance"""
+        with patch.object(semantic_search, "_nlp", None), \
+                patch.object(semantic_search, "_st_model", None), \
+                patch("spacy.load", return_value=Mock()) as mock_spacy_load, \
+                patch("sentence_transformers.SentenceTransformer", return_value=Mock()) as mock_st:
+            mock_spacy_load.assert_not_called()
+            mock_st.assert_not_called()
+            backend = semantic_search.SentenceTransformerBackend()
+            backend.warm_up()
+            backend.warm_up()
+            mock_spacy_load.assert_called_once_with(semantic_search.SPACY_MODEL)
+            mock_st.assert_called_once_with(semantic_search.SENTENCE_TRANSFORMER_MODEL)
+
+    def test_hashing_backend_is_deterministic(self):
+        """Test the hashing backend returns the same unit vector for the same text"""
+        backend = semantic_search.HashingBackend()
+        first, second = backend.embed(["Board games night", "board GAMES night!"])
+        self.assertEqual(first.shape, (384,))
+        self.assertTrue(np.array_equal(first, second))
+        self.assertTrue(np.isclose(np.linalg.norm(first), 1.0))
+
+    def test_hashing_backend_shared_words_are_similar(self):
+        """Test texts sharing words are closer than unrelated texts"""
+        backend = semantic_search.HashingBackend()
+        query, related, unrelated = backend.embed(["hiking trip", "weekend hiking trip", "jazz concert"])
+        self.assertGreater(query @ related, query @ unrelated)
+
+    @override_settings(EMBEDDING_BACKEND='events.semantic_search.HashingBackend')
+    def test_get_backend_uses_settings(self):
+        """Test get_backend instantiates the configured backend once"""
+        backend = semantic_search.get_backend()
+        self.assertIsInstance(backend, semantic_search.HashingBackend)
+        self.assertIs(backend, semantic_search.get_backend())
+
+    def test_texts_to_vectors_batches(self):
+        """Test texts_to_vectors returns one row per text"""
+        vectors = semantic_search.texts_to_vectors(["one", "two", "three"])
+        self.assertEqual(vectors.shape, (3, 384))
+
     def test_compute_similarities_empty_list(self):
         """Test compute_similarities with an empty event vector list"""
         query_vec = np.random.rand(384)  # Simulate a random query vector
@@ -976,6 +2346,291 @@ class SemanticSearchTestCase(TestCase):
         # Use np.isclose to handle floating-point precision issues
         self.assertTrue(all(np.isclose(sim, 1.0, atol=1e-6) for sim in similarities))
 
+class VectorFieldTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="vectoruser", email="vector@test.com")
+        self.vector = np.random.default_rng(0).standard_normal(384).astype(np.float32)
+
+    def test_float32_round_trip_is_exact_and_zero_copy(self):
+        """Test float32 vectors decode to the same values without copying the buffer"""
+        packed = pack_vector(self.vector.tolist(), dtype='float32')
+        self.assertEqual(len(packed), 4 + 384 * 4)
+        decoded = unpack_vector(packed)
+        self.assertTrue(np.array_equal(decoded, self.vector))
+        self.assertFalse(decoded.flags.owndata)
+
+    def test_float16_round_trip(self):
+        """Test float16 vectors decode close to the original"""
+        packed = pack_vector(self.vector, dtype='float16')
+        self.assertEqual(len(packed), 4 + 384 * 2)
+        self.assertTrue(np.allclose(unpack_vector(packed), self.vector, atol=1e-3))
+
+    def test_int8_round_trip_preserves_similarity(self):
+        """Test int8 vectors keep cosine similarity to the original"""
+        packed = pack_vector(self.vector, dtype='int8')
+        self.assertEqual(len(packed), 4 + 384)
+        similarity = compute_similarities(self.vector, [packed])[0]
+        self.assertGreater(similarity, 0.99)
+
+    def test_event_vector_is_stored_as_binary(self):
+        """Test Event.vector is loaded back from the database as a float32 array"""
+        event = Event.objects.create(
+            title="Binary Vector Event",
+            category="Test",
+            city="Test City",
+            location="Test Location",
+            start_time=timezone.now() + timezone.timedelta(days=5),
+            end_time=timezone.now() + timezone.timedelta(days=6),
+            capacity=10,
+            creator=self.user
+        )
+        Event.objects.filter(pk=event.pk).update(vector=self.vector.tolist())
+        stored = Event.objects.values_list('vector', flat=True).get(pk=event.pk)
+        self.assertEqual(stored.dtype, np.float32)
+        self.assertTrue(np.array_equal(stored, self.vector))
+
+class CityVectorIndexTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="indexuser", email="index@test.com")
+        self.events = []
+        for i, vector in enumerate([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.6, 0.8, 0.0]]):
+            event = Event.objects.create(
+                title=f"Index Event {i}",
+                category="Test",
+                city="Index City",
+                location="Test Location",
+                start_time=timezone.now() + timezone.timedelta(days=10 + i),
+                end_time=timezone.now() + timezone.timedelta(days=11 + i),
+                capacity=10,
+                creator=self.user
+            )
+            Event.objects.filter(pk=event.pk).update(vector=vector)
+            self.events.append(event)
+        rebuild_index()
+
+    def test_search_ranks_by_cosine_similarity(self):
+        """Test the index returns ids ordered by descending similarity"""
+        ids, scores = vector_index.search("index city", [2.0, 0.1, 0.0])
+        self.assertEqual(list(ids), [self.events[0].pk, self.events[2].pk, self.events[1].pk])
+        self.assertTrue(np.all(np.diff(scores) <= 0))
+
+    def test_search_with_limit_returns_top_k(self):
+        """Test the index only returns the best `limit` rows"""
+        ids, _ = vector_index.search("Index City", [0.0, 1.0, 0.0], limit=2)
+        self.assertEqual(list(ids), [self.events[1].pk, self.events[2].pk])
+
+    def test_search_with_offset_returns_rank_window(self):
+        """Test the index returns only the requested rank window"""
+        ids, _ = vector_index.search("Index City", [0.0, 1.0, 0.0], offset=1, limit=1)
+        self.assertEqual(list(ids), [self.events[2].pk])
+        ids, _ = vector_index.search("Index City", [0.0, 1.0, 0.0], offset=3, limit=20)
+        self.assertEqual(len(ids), 0)
+
+    def test_city_spellings_share_one_index_entry(self):
+        """Test an event saved with a differently spelled city updates the entry searches read"""
+        def create(title, city):
+            return Event.objects.create(
+                title=title,
+                category="Test",
+                city=city,
+                location="Test Location",
+                start_time=timezone.now() + timezone.timedelta(days=10),
+                end_time=timezone.now() + timezone.timedelta(days=11),
+                capacity=10,
+                creator=self.user
+            )
+        # Lookup ids cached by the executed callbacks belong to rows the test rollback discards
+        self.addCleanup(category_ids.clear)
+        self.addCleanup(city_ids.clear)
+        create("Board games night", "Waterloo")
+        self.assertEqual(vector_index.count("Waterloo"), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            event = create("Sunrise kayaking", " waterloo ")
+        ids, _ = vector_index.search("WATERLOO", text_to_vector("Sunrise kayaking"), limit=1)
+        self.assertEqual(list(ids), [event.pk])
+
+    def test_top_k_matches_full_sort(self):
+        """Test every top_k window agrees with a full argsort"""
+        scores = np.random.default_rng(1).random(200).astype(np.float32)
+        ids = np.arange(200, 400)
+        expected = ids[np.argsort(-scores, kind='stable')]
+        for start in range(0, 200, 20):
+            window_ids, window_scores = semantic_search.top_k(ids, scores, start, start + 20)
+            self.assertEqual(list(window_ids), list(expected[start:start + 20]))
+            self.assertTrue(np.all(np.diff(window_scores) <= 0))
+
+    @patch("events.views.query_to_vector", return_value=[0.0, 1.0, 0.0])
+    def test_search_view_fetches_only_the_page(self, mock_vectorizer):
+        """Test a paged semantic search returns the ranked page window"""
+        url = reverse('search_events') + "?city=Index%20City&query=anything&page=0"
+        response = self.client.get(url)
+        self.assertEqual([e['id'] for e in response.data], [self.events[1].pk, self.events[2].pk, self.events[0].pk])
+        response = self.client.get(reverse('search_events') + "?city=Index%20City&query=anything&page=1")
+        self.assertEqual(response.data, [])
+
+    def test_update_event_removes_cancelled_event(self):
+        """Test a cancelled event is dropped from the loaded city"""
+        vector_index.search("Index City", [1.0, 0.0, 0.0])
+        event = Event.objects.get(pk=self.events[0].pk)
+        event.cancelled = True
+        vector_index.update_event(event)
+        ids, _ = vector_index.search("Index City", [1.0, 0.0, 0.0])
+        self.assertNotIn(event.pk, list(ids))
+
+    def test_remove_event(self):
+        """Test a deleted event is dropped from the loaded city"""
+        vector_index.search("Index City", [1.0, 0.0, 0.0])
+        vector_index.remove_event(self.events[1].pk, "Index City")
+        ids, _ = vector_index.search("Index City", [0.0, 1.0, 0.0])
+        self.assertEqual(len(ids), 2)
+        self.assertNotIn(self.events[1].pk, list(ids))
+
+    @patch("events.views.query_to_vector", return_value=[0.0, 1.0, 0.0])
+    def test_search_view_uses_index_ranking(self, mock_vectorizer):
+        """Test search_events returns events in index order and skips rows that are no longer live"""
+        Event.objects.filter(pk=self.events[2].pk).update(cancelled=True)
+        url = reverse('search_events') + "?city=Index%20City&query=anything"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([e['id'] for e in response.data], [self.events[1].pk, self.events[0].pk])
+
+class QueryEmbeddingCacheTestCase(TestCase):
+    def setUp(self):
+        self.cache = semantic_search.QueryEmbeddingCache()
+
+    def test_repeated_query_is_a_hit(self):
+        """Test normalized repeats of a query skip the backend"""
+        with patch.object(semantic_search.HashingBackend, "embed", wraps=semantic_search.get_backend().embed) as mock_embed:
+            first = self.cache.get("Board Games")
+            second = self.cache.get("  board   games ")
+        self.assertEqual(mock_embed.call_count, 1)
+        self.assertTrue(np.array_equal(first, second))
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+    @override_settings(QUERY_EMBEDDING_CACHE_SIZE=2)
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test the cache stays bounded and evicts the least recently used query"""
+        self.cache.get("hiking")
+        self.cache.get("food")
+        self.cache.get("hiking")
+        self.cache.get("board games")
+        self.assertEqual(self.cache.stats()['size'], 2)
+        self.cache.get("hiking")
+        self.cache.get("food")
+        self.assertEqual(self.cache.stats()['hits'], 2)
+        self.assertEqual(self.cache.stats()['misses'], 4)
+
+    @override_settings(QUERY_EMBEDDING_CACHE_TTL=0)
+    def test_expired_entry_is_recomputed(self):
+        """Test entries older than the TTL count as misses"""
+        self.cache.get("hiking")
+        self.cache.get("hiking")
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+class CountingHashingBackend(semantic_search.HashingBackend):
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        return super().embed(texts)
+
+
+class OtherModelBackend(semantic_search.HashingBackend):
+    model_id = 'other-model'
+
+
+class EmbeddingServerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.address = f"unix:{os.path.join(self.tmpdir.name, 'embedding.sock')}"
+        self.backend = CountingHashingBackend()
+        self.server = make_server(self.address, self.backend, max_batch_size=64, max_wait=0.05)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def remote_backend(self):
+        with override_settings(EMBEDDING_SERVER_ADDRESS=self.address):
+            return RemoteBackend()
+
+    def test_remote_embeddings_match_local(self):
+        """Test the server returns the same vectors as the backend it wraps"""
+        texts = ["hiking trip", "board games night"]
+        remote = self.remote_backend()
+        self.assertTrue(np.allclose(remote.embed(texts), semantic_search.HashingBackend().embed(texts)))
+        self.assertEqual(remote.model_id, "hashing")
+        self.assertEqual(remote.dimension, 384)
+
+    def test_concurrent_requests_are_batched(self):
+        """Test concurrent callers share backend calls"""
+        remote = self.remote_backend()
+        results = {}
+
+        def worker(i):
+            results[i] = remote.embed([f"event number {i}"])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 8)
+        self.assertLess(self.backend.calls, 8)
+        expected = semantic_search.HashingBackend().embed(["event number 3"])
+        self.assertTrue(np.allclose(results[3], expected))
+
+    @override_settings(EMBEDDING_SERVER_BACKEND='events.semantic_search.HashingBackend')
+    def test_falls_back_to_in_process_backend(self):
+        """Test an unreachable server falls back to EMBEDDING_SERVER_BACKEND"""
+        missing = f"unix:{os.path.join(self.tmpdir.name, 'missing.sock')}"
+        with override_settings(EMBEDDING_SERVER_ADDRESS=missing):
+            remote = RemoteBackend()
+        vectors = remote.embed(["hiking"])
+        self.assertEqual(vectors.shape, (1, 384))
+        self.assertEqual(self.backend.calls, 0)
+
+    @override_settings(EMBEDDING_SERVER_BACKEND='events.semantic_search.HashingBackend')
+    def test_unreachable_server_is_not_retried_on_every_call(self):
+        """Test the fallback decision is remembered for EMBEDDING_SERVER_RETRY seconds"""
+        missing = f"unix:{os.path.join(self.tmpdir.name, 'missing.sock')}"
+        with override_settings(EMBEDDING_SERVER_ADDRESS=missing):
+            remote = RemoteBackend()
+        with patch.object(remote, '_connection', wraps=remote._connection) as connect:
+            self.assertEqual(remote.model_id, "hashing")
+            attempts = connect.call_count
+            for _ in range(5):
+                remote.model_id
+                remote.embed(["hiking"])
+            self.assertEqual(connect.call_count, attempts)
+            with patch("events.embedding_server.time.monotonic", return_value=time.monotonic() + 31):
+                remote.model_id
+            self.assertGreater(connect.call_count, attempts)
+
+    def test_server_model_id_survives_an_outage(self):
+        """Test model_id keeps the server's value while the in-process fallback is serving"""
+        remote = self.remote_backend()
+        self.assertEqual(remote.model_id, "hashing")
+        with override_settings(EMBEDDING_SERVER_BACKEND='events.semantic_search.HashingBackend'), \
+                patch.object(remote, '_request', side_effect=OSError):
+            self.assertEqual(remote.embed(["hiking"]).shape, (1, 384))
+            self.assertEqual(remote.model_id, "hashing")
+
+    @override_settings(EMBEDDING_SERVER_BACKEND='events.tests.OtherModelBackend')
+    def test_fallback_with_another_model_is_refused(self):
+        """Test vectors from a different in-process model are never passed off as the server's"""
+        remote = self.remote_backend()
+        self.assertEqual(remote.model_id, "hashing")
+        with patch.object(remote, '_request', side_effect=OSError):
+            with self.assertRaises(RuntimeError):
+                remote.embed(["hiking"])
+            self.assertEqual(remote.model_id, "hashing")
+
 class EventSerializerTestCase(TestCase):
     def setUp(self):
         """Set up test data"""
@@ -1,11 +1,15 @@
 from django.urls import path
 from .views import (
+    batch_events,
     list_user_created_events, 
     list_user_joined_events, 
     create_event, 
+    bulk_import_events,
     event_detail, 
     join_event, 
+    hold_seat,
     leave_event,
+    event_waitlist,
     random_events,
     search_events,
     filter_events,
@@ -16,12 +20,16 @@ from .views import (
 
 
 urlpatterns = [
+    path('', batch_events, name='batch_events'),
     path('created/', list_user_created_events, name='list_user_created_events'),
     path('joined/', list_user_joined_events, name='list_user_joined_events'),
     path('new/', create_event, name='create_event'),
+    path('import/', bulk_import_events, name='bulk_import_events'),
     path('<int:pk>/', event_detail, name='event_detail'),
     path('<int:pk>/join/', join_event, name='join_event'),
+    path('<int:pk>/hold/', hold_seat, name='hold_seat'),
     path('<int:pk>/leave/', leave_event, name='leave_event'),
+    path('<int:pk>/waitlist/', event_waitlist, name='event_waitlist'),
     path('fetch/random/', random_events, name='random_events'),
     path('search/', search_events, name='search_events'),
     path('filter/', filter_events, name='filter_events'),
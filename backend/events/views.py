@@ -2,17 +2,41 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.db import connection
 from django.db.models import Count
 from django.db.models import Q
-from django.utils import timezone
 from django.conf import settings
-import random
 import numpy as np
 import openai
-from .models import Event
-from .serializers import EventSerializer
-from .semantic_search import text_to_vector, compute_similarities
+from .models import Event, EventStatus, VectorState, WaitlistEntry
+from .serializers import EventSerializer, serialize_event_rows
+from .holds import seat_holds
+from .importing import import_events, parse_rows
+from .pagination import keyset_page
+from .semantic_search import current_model_id, query_to_vector, vector_index
+from backend.conditional import conditional_get, make_etag, not_modified, set_validators
+
+
+def list_response(request, events, vary=()):
+    """
+    Serialized `events` with a weak ETag, or 304 if the client's copy is current
+    """
+    try:
+        fields = EventSerializer.requested_fields(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    etag = make_etag(events.list_etag(), weak=True)
+    response = not_modified(request, etag)
+    if response is None:
+        response = Response(serialize_event_rows(events, fields=fields), status=status.HTTP_200_OK)
+    return set_validators(response, etag, vary=vary)
+
+
+def event_validators(request, pk):
+    event = Event.objects.filter(pk=pk).only('id', 'updated_at', 'end_time').first()
+    return event.detail_validators() if event is not None else None
 
 
 @api_view(['GET'])
@@ -21,9 +45,8 @@ def list_user_created_events(request):
     """
     GET: Return all events created by current user
     """
-    events = Event.objects.filter(creator=request.user)
-    serializer = EventSerializer(events, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    events = Event.objects.for_list().filter(creator=request.user)
+    return list_response(request, events, vary=['Authorization'])
 
 
 @api_view(['GET'])
@@ -32,9 +55,44 @@ def list_user_joined_events(request):
     """
     GET: Return all events joined by current user
     """
-    events = request.user.joined_events.all()
-    serializer = EventSerializer(events, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    events = Event.objects.for_list().filter(participants=request.user)
+    return list_response(request, events, vary=['Authorization'])
+
+
+def parse_ids(value):
+    """
+    Distinct ids, in order, from a comma-separated ?ids= value (at most EVENT_BATCH_MAX).
+    Raises ValueError.
+    """
+    try:
+        ids = [int(part) for part in (value or '').split(',') if part.strip()]
+    except ValueError:
+        raise ValueError("Invalid ids parameter")
+    low, high = connection.ops.integer_field_range(Event._meta.pk.get_internal_type())
+    if any(not low <= pk <= high for pk in ids):
+        raise ValueError("Invalid ids parameter")
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise ValueError("Missing 'ids' parameter")
+    maximum = getattr(settings, 'EVENT_BATCH_MAX', 100)
+    if len(ids) > maximum:
+        raise ValueError(f"At most {maximum} ids per request")
+    return ids
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def batch_events(request):
+    """
+    GET: Return several events by id in one request, e.g. ?ids=1,2,3
+      - Events come back in the order requested; ids that don't exist are left out.
+      - At most EVENT_BATCH_MAX ids; fields / exclude (optional) as for the other listings.
+    """
+    try:
+        ids = parse_ids(request.GET.get('ids'))
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return list_response(request, Event.objects.for_list().by_ids(ids))
 
 
 @api_view(['POST'])
@@ -52,22 +110,60 @@ def create_event(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_import_events(request):
+    """
+    POST /api/events/import/
+      - JSON body: a list of events, or {"events": [...]}
+      - multipart/form-data: 'file' holding a .csv (header row) or .json export
+    All rows are validated first; nothing is created if any row is invalid.
+    """
+    upload = request.FILES.get('file')
+    try:
+        if upload is not None:
+            fmt = 'csv' if upload.name.lower().endswith('.csv') else 'json'
+            rows = parse_rows(upload.read(), fmt)
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            rows = request.data.get('events') if isinstance(request.data, dict) else None
+            if not isinstance(rows, list):
+                return Response({"error": "Expected a list of events or a 'file' upload."},
+                                status=status.HTTP_400_BAD_REQUEST)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    created, errors = import_events(rows, request.user)
+    if errors:
+        return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"created": len(created), "ids": [event.pk for event in created]},
+                    status=status.HTTP_201_CREATED)
+
+
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
 @permission_classes([permissions.IsAuthenticatedOrReadOnly])
+@conditional_get(event_validators)
 def event_detail(request, pk):
     """
-    GET: Get detail of an event
+    GET: Get detail of an event (ETag / Last-Modified; 304 when unchanged)
+         fields / exclude (optional): comma-separated subset of the event's fields
     PUT: Update an event (full)
     PATCH: Update an event (partial)
     DELETE: Delete an event
     """
-    event = get_object_or_404(Event, pk=pk)
-
     if request.method == 'GET':
-        serializer = EventSerializer(event)
+        try:
+            fields = EventSerializer.requested_fields(request)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        event = get_object_or_404(EventSerializer.narrow(Event.objects.with_status(), fields), pk=pk)
+        serializer = EventSerializer(event, fields=fields)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-    elif request.method in ['PUT', 'PATCH']:
+    event = get_object_or_404(Event, pk=pk)
+
+    if request.method in ['PUT', 'PATCH']:
         # Only event creator can edit
         if event.creator != request.user:
             return Response({"error": "No permission to edit this event."},
@@ -93,65 +189,149 @@ def event_detail(request, pk):
 def join_event(request, pk):
     """
     User wants to join an event
-    - Check if the user already joined
-    - Check attendance and capacity
+    - Body may carry {"hold": "<hold id>"} from POST /api/events/<pk>/hold/ to confirm a held seat
+    - Without a hold, the request is turned away from the cache while every free seat is held
+    - The seat is taken atomically, so concurrent joins cannot overbook
+    - Fails if the user already joined or the event is at capacity
     """
-    event = get_object_or_404(Event, pk=pk)
-
-    # Event is full
-    if event.attendance >= event.capacity:
-        return Response({"error": "The event is already at full capacity."},
-                        status=status.HTTP_400_BAD_REQUEST)
-
-    # If the user already joined
-    if event.participants.filter(pk=request.user.pk).exists():
-        return Response({"error": "You have already joined this event."},
+    hold_id = request.data.get('hold')
+    try:
+        if hold_id:
+            if not seat_holds.is_valid(pk, request.user, hold_id):
+                return Response({"error": "Your seat hold has expired."},
+                                status=status.HTTP_400_BAD_REQUEST)
+        elif seat_holds.fully_held(pk):
+            return Response({"error": "The event is already at full capacity."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        Event.join(pk, request.user)
+    except Event.DoesNotExist:
+        raise Http404("No Event matches the given query.")
+    except ValidationError as exc:
+        return Response({"error": exc.messages[0]},
                         status=status.HTTP_400_BAD_REQUEST)
 
-    event.participants.add(request.user)
-    event.attendance = event.participants.count()
-    event.save()
-
+    if hold_id:
+        seat_holds.confirmed(pk, request.user, hold_id)
     return Response({"message": "Successfully joined the event."},
                     status=status.HTTP_200_OK)
 
 
+@api_view(['POST', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def hold_seat(request, pk):
+    """
+    POST: Hold a seat for SEAT_HOLD_TTL seconds without touching the database.
+          Confirm it with POST /api/events/<pk>/join/ and body {"hold": "<hold id>"}.
+    DELETE: Give a held seat back; it goes to the head of the waitlist, if any. Body: {"hold": "<hold id>"}
+    """
+    if request.method == 'POST':
+        try:
+            hold_id = seat_holds.acquire(pk, request.user)
+        except Event.DoesNotExist:
+            raise Http404("No Event matches the given query.")
+        if hold_id is None:
+            return Response({"error": "The event is already at full capacity."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({"hold": hold_id, "expires_in": seat_holds.ttl},
+                        status=status.HTTP_201_CREATED)
+
+    if not seat_holds.release(pk, request.user, request.data.get('hold', '')):
+        return Response({"error": "Your seat hold has expired."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    Event.promote_waitlist(pk)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def leave_event(request, pk):
     """
     User wants to leave an event
-    - Check if the user is a participant
+    - Fails if the user is not a participant
     """
-    event = get_object_or_404(Event, pk=pk)
-
-    # If user is not in participants
-    if not event.participants.filter(pk=request.user.pk).exists():
-        return Response({"error": "You are not a participant of this event."},
+    try:
+        Event.leave(pk, request.user)
+    except Event.DoesNotExist:
+        raise Http404("No Event matches the given query.")
+    except ValidationError as exc:
+        return Response({"error": exc.messages[0]},
                         status=status.HTTP_400_BAD_REQUEST)
 
-    event.participants.remove(request.user)
-    event.attendance = event.participants.count()
-    event.save()
-
     return Response({"message": "Successfully left the event."},
                     status=status.HTTP_200_OK)
 
+@api_view(['POST', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def event_waitlist(request, pk):
+    """
+    POST: Queue for a seat at a full event (joins directly if a seat is free and not held).
+          The first waitlisted user is seated automatically when a participant leaves.
+    DELETE: Leave the waitlist
+    """
+    if request.method == 'POST':
+        try:
+            entry = Event.join_waitlist(pk, request.user)
+        except Event.DoesNotExist:
+            raise Http404("No Event matches the given query.")
+        except ValidationError as exc:
+            return Response({"error": exc.messages[0]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if entry is None:
+            return Response({"message": "Successfully joined the event."},
+                            status=status.HTTP_200_OK)
+        return Response({"message": "Added to the waitlist.", "position": entry.position()},
+                        status=status.HTTP_201_CREATED)
+
+    removed, _ = WaitlistEntry.objects.filter(event_id=pk, user=request.user).delete()
+    if not removed:
+        return Response({"error": "You are not on the waitlist for this event."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def random_events(request):
     """
-    GET: Return up to 20 random events from the database
+    GET: Return up to 20 random upcoming events
+      - city (optional): only sample events in this city
+      - fields / exclude (optional): comma-separated subset of each event's fields
     """
-    total_count = Event.objects.count()
-    if total_count <= 20:
-        events = Event.objects.all()
-    else:
-        random_ids = random.sample(range(1, total_count + 1), 20)
-        events = Event.objects.filter(pk__in=random_ids)
-    serializer = EventSerializer(events, many=True)
+    try:
+        fields = EventSerializer.requested_fields(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    events = EventSerializer.narrow(Event.objects.for_list().upcoming(), fields)
+    city = request.GET.get('city')
+    if city:
+        events = events.in_city(city)
+    serializer = EventSerializer(events.random_sample(20), many=True, fields=fields)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
+def wants_cursor(request):
+    return 'cursor' in request.GET or 'page_size' in request.GET
+
+def cursor_page_response(request, qs, fields=None):
+    """
+    Keyset-paginated envelope: {"results": [...], "next": <cursor or null>}
+    Pass `next` back as ?cursor= for the following page.
+    """
+    # The cursor is built from the page's last start_time, so it is loaded even if not serialized
+    qs = EventSerializer.narrow(qs, fields, extra=['start_time'])
+    try:
+        events, next_cursor = keyset_page(qs, request.GET.get('cursor'), request.GET.get('page_size'))
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = EventSerializer(events, many=True, fields=fields)
+    return Response({"results": serializer.data, "next": next_cursor}, status=status.HTTP_200_OK)
+
+def keyword_filter(qs, query):
+    """
+    Keep events whose title or description contains every word of the query
+    """
+    for word in query.split():
+        qs = qs.filter(Q(title__icontains=word) | Q(description__icontains=word))
+    return qs
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def search_events(request):
@@ -160,16 +340,31 @@ def search_events(request):
       - city (necessary)
       - query (optional)
       - page (optional)
+      - cursor / page_size (optional, without query): keyset pages as {"results": [...], "next": cursor}
+      - fields / exclude (optional): comma-separated subset of each event's fields
     """
     city = request.GET.get('city')
     if not city:
         return Response({"error": "Missing 'city' parameter"}, status=400)
+    try:
+        fields = EventSerializer.requested_fields(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
     query = request.GET.get('query')
-    events_qs = Event.objects.filter(city__iexact=city, start_time__gte=timezone.now(), cancelled=False)
+    events_qs = Event.objects.for_list().upcoming().in_city(city)
+
+    # Weak ETag over the whole city listing, checked before anything is ranked or serialized
+    etag = make_etag(events_qs.list_etag(model_id=current_model_id()), weak=True)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return set_validators(cached, etag)
 
     if not query:
-        events_qs = events_qs.order_by('start_time')
+        if wants_cursor(request):
+            return set_validators(cursor_page_response(request, events_qs, fields), etag)
+
+        events_qs = events_qs.order_by('start_time', 'id')
         
         page_param = request.GET.get('page')
         if page_param is not None:
@@ -182,28 +377,9 @@ def search_events(request):
             end_idx = (page + 1) * page_size
             events_qs = events_qs[start_idx:end_idx]
         
-        serializer = EventSerializer(events_qs, many=True)
-        return Response(serializer.data, status=200)
+        return set_validators(Response(serialize_event_rows(events_qs, fields=fields), status=200), etag)
     else:
-        query_vec = text_to_vector(query)
-        
-        valid_events = []
-        vectors = []
-        for e in events_qs:
-            if e.vector:
-                valid_events.append(e)
-                vectors.append(e.vector)
-        
-        # Handle the case where no events have vectors
-        if not valid_events:
-            serializer = EventSerializer([], many=True)
-            return Response(serializer.data, status=200)
-
-        sims = compute_similarities(query_vec, vectors)
-        event_sims = list(zip(valid_events, sims))
-        event_sims.sort(key=lambda x: x[1], reverse=True)
-        sorted_events = [pair[0] for pair in event_sims]
-
+        offset, limit = 0, None
         page_param = request.GET.get('page')
         if page_param is not None:
             try:
@@ -211,12 +387,36 @@ def search_events(request):
             except ValueError:
                 return Response({"error": "Invalid page parameter"}, status=400)
             page_size = 20
-            start_idx = page * page_size
-            end_idx = (page + 1) * page_size
-            sorted_events = sorted_events[start_idx:end_idx]
+            offset, limit = max(page * page_size, 0), page_size
+
+        # Rank ids and scores only, then fetch just the rows of the requested window
+        events_qs = EventSerializer.narrow(events_qs, fields)
+        query_vec = query_to_vector(query)
+        ranked_ids, _ = vector_index.search(city, query_vec, offset=offset, limit=limit)
+        ranked_ids = ranked_ids.tolist()
+
+        # The index may briefly lag the database, so re-check every hit is still live
+        live_events = events_qs.filter(vector__isnull=False).in_bulk(ranked_ids)
+        sorted_events = [live_events[pk] for pk in ranked_ids if pk in live_events]
+
+        # Events the index can't rank yet (still waiting for a vector, or holding one from another
+        # model) are matched by keyword and ranked after every semantic hit
+        ranked_count = vector_index.count(city)
+        end = None if limit is None else offset + limit
+        if end is None or end > ranked_count:
+            model_id = current_model_id()
+            unranked = events_qs.exclude(vector__isnull=False, vector_model=model_id).filter(
+                Q(vector_state__in=[VectorState.PENDING, VectorState.FAILED]) | ~Q(vector_model=model_id)
+            )
+            pending_qs = keyword_filter(unranked, query).order_by('start_time')
+            pending_start = max(offset - ranked_count, 0)
+            if end is None:
+                sorted_events += list(pending_qs[pending_start:])
+            else:
+                sorted_events += list(pending_qs[pending_start:end - ranked_count])
 
-        serializer = EventSerializer(sorted_events, many=True)
-        return Response(serializer.data, status=200)
+        serializer = EventSerializer(sorted_events, many=True, fields=fields)
+        return set_validators(Response(serializer.data, status=200), etag)
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
@@ -230,8 +430,13 @@ def filter_events(request):
       - The key and name must appear in pairs and in equal numbers; otherwise, a 400 error is thrown.
       - For each pair (key_i, name_i), both must be satisfied (logical AND).
       - By default, sorting is done in ascending order by start_time.
-      - Acceptable keys are category, city, status (active or full).
+      - Acceptable keys are category, city, status (active, full or expire).
+        status=expire lists events that have ended instead of upcoming ones.
+      - ordering=status / -status (optional): active, full, expire order (or reversed), then start_time.
+      - fields / exclude (optional): comma-separated subset of each event's fields.
       - Page is optional.
+      - cursor / page_size (optional) switch to keyset pages: {"results": [...], "next": cursor}.
+        Start with ?page_size=N (capped at EVENT_PAGE_SIZE_MAX) and pass `next` back as ?cursor=.
     """
 
     keys = request.GET.getlist('key', [])
@@ -244,7 +449,22 @@ def filter_events(request):
         return Response({"error": "At least one pair of (key, name) is required."},
                         status=status.HTTP_400_BAD_REQUEST)
 
-    qs = Event.objects.filter(start_time__gte=timezone.now(), cancelled=False)
+    try:
+        fields = EventSerializer.requested_fields(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    ordering = request.GET.get('ordering')
+    if ordering not in (None, 'status', '-status'):
+        return Response({"error": f"Unsupported ordering: {ordering}. Allowed: status, -status."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    statuses = [v.lower() for k, v in zip(keys, names) if k.lower() == "status"]
+    if EventStatus.EXPIRE in statuses:
+        # Expired events have started too, so upcoming() would rule them all out
+        qs = Event.objects.for_list().filter(cancelled=False)
+    else:
+        qs = Event.objects.for_list().upcoming()
 
     for k, v in zip(keys, names):
         
@@ -252,23 +472,34 @@ def filter_events(request):
         v_lower = v.lower()
         
         if k_lower == "city":
-            qs = qs.filter(city__iexact=v)
+            qs = qs.in_city(v)
         elif k_lower == "category":
-            qs = qs.filter(category__iexact=v)
+            qs = qs.in_category(v)
         elif k_lower == "status":
-            # status => active/full
-            if v_lower == "active":
-                qs = qs.filter(attendance__lt=models.F('capacity'))
-            elif v_lower == "full":
-                qs = qs.filter(attendance__gte=models.F('capacity'))
-            else:
-                return Response({"error": f"Unsupported status value: {v}. Allowed: active, full."},
+            # status => active/full/expire, from the same annotation the serializer reads
+            if v_lower not in EventStatus.values:
+                return Response({"error": f"Unsupported status value: {v}. Allowed: active, full, expire."},
                                 status=status.HTTP_400_BAD_REQUEST)
+            qs = qs.filter(status=v_lower)
         else:
             return Response({"error": f"Unsupported key: {k}. Allowed keys: city, category."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-    qs = qs.order_by('start_time')
+    etag = make_etag(qs.list_etag(), weak=True)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return set_validators(cached, etag)
+
+    if wants_cursor(request):
+        if ordering:
+            return Response({"error": "ordering is not supported with cursor pages."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return set_validators(cursor_page_response(request, qs, fields), etag)
+
+    if ordering:
+        qs = qs.order_by_status(descending=ordering.startswith('-'))
+    else:
+        qs = qs.order_by('start_time', 'id')
 
     page_param = request.GET.get('page')
     if page_param is not None:
@@ -282,8 +513,7 @@ def filter_events(request):
         end_idx = (page + 1) * page_size
         qs = qs[start_idx:end_idx]
 
-    serializer = EventSerializer(qs, many=True)
-    return Response(serializer.data, status=200)
+    return set_validators(Response(serialize_event_rows(qs, fields=fields), status=200), etag)
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -301,12 +531,12 @@ def cancel_event(request, pk):
     reverse_param = request.query_params.get('reverse', '').lower()
     if reverse_param == 'true':
         event.cancelled = False
-        event.save()
+        event.save(update_fields=['cancelled', 'updated_at'])
         return Response({"message": f"Event {pk} activated."},
                         status=status.HTTP_200_OK)
     else:
         event.cancelled = True
-        event.save()
+        event.save(update_fields=['cancelled', 'updated_at'])
         return Response({"message": f"Event {pk} cancelled."},
                         status=status.HTTP_200_OK)
 
@@ -0,0 +1,15 @@
+"""
+Gunicorn settings for the backend, picked up automatically when gunicorn is started from this directory.
+"""
+import os
+
+
+def post_worker_init(worker):
+    """
+    Load the embedding models once per worker, right after the Django app is loaded,
+    so the first search or event write served by the worker doesn't pay for it.
+    Set EMBEDDING_WARM_UP=false to keep them lazy.
+    """
+    if os.getenv('EMBEDDING_WARM_UP', 'true').lower() == 'true':
+        from events.semantic_search import warm_up
+        warm_up()
@@ -1,7 +1,8 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from storages.backends.s3boto3 import S3Boto3Storage
+from .usernames import usernames
 
 # Create your models here.
 class User(AbstractUser):
@@ -13,6 +14,17 @@ class User(AbstractUser):
     bio = models.TextField(null=True, blank=True)
     interests = models.JSONField(default=list, null=True, blank=True)
     show_email = models.BooleanField(default=False)
+    # Bumped on every save; drives the profile ETag / Last-Modified
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'username' in update_fields:
+            # Drop the cached username now, and again after commit so no lookup re-caches the old one
+            pk = self.pk
+            usernames.forget(pk)
+            transaction.on_commit(lambda: usernames.forget(pk))
 
     def clean(self):
         """Ensure Facebook ID does not exceed max_length."""
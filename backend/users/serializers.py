@@ -1,17 +1,20 @@
 from rest_framework import serializers
+from backend.sparse import SparseFieldsMixin
 from .models import User
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "email", "profile_image", "location", "bio", "interests", "show_email"]
         read_only_fields = ["id", "username"]
+        # Whether email is shown depends on show_email
+        column_sources = {"email": ["email", "show_email"]}
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
         request = self.context.get('request')
         
-        if not (instance.show_email or (request and request.user == instance)):
+        if 'email' in data and not (instance.show_email or (request and request.user == instance)):
             data.pop('email', None)
             
         return data
\ No newline at end of file
@@ -407,4 +407,58 @@ class TestUserProfile:
         response = self.client.get(f"/api/users/{non_existent_id}/")  # Updated URL path
         
         # Assertions
-        assert response.status_code == 404
\ No newline at end of file
+        assert response.status_code == 404
+
+    def test_user_profile_not_modified(self):
+        """
+        Test a matching If-None-Match is answered with 304 and no body.
+        """
+        response = self.client.get(f"/api/users/{self.user.pk}/")
+        etag = response["ETag"]
+        assert response["Last-Modified"]
+
+        with patch("api.views.UserSerializer.to_representation") as mock_serialize:
+            cached = self.client.get(f"/api/users/{self.user.pk}/", HTTP_IF_NONE_MATCH=etag)
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not cached.content
+        mock_serialize.assert_not_called()
+
+    def test_user_profile_etag_changes_on_update(self):
+        """
+        Test a profile edit invalidates the ETag.
+        """
+        etag = self.client.get(f"/api/users/{self.user.pk}/")["ETag"]
+        self.client.post("/api/users/update/", {"location": "Waterloo"})
+        response = self.client.get(f"/api/users/{self.user.pk}/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.data["location"] == "Waterloo"
+
+    def test_user_profile_etag_depends_on_viewer(self):
+        """
+        Test the owner's copy (which includes the email) never validates another viewer's request.
+        """
+        own_etag = self.client.get(f"/api/users/{self.user.pk}/")["ETag"]
+        other = User.objects.create(username="profile_viewer", email="viewer@example.com")
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f"/api/users/{self.user.pk}/", HTTP_IF_NONE_MATCH=own_etag)
+        assert response.status_code == 200
+        assert "email" not in response.data
+
+    def test_user_profile_fields(self):
+        """
+        Test ?fields= narrows the profile and email stays hidden from other viewers.
+        """
+        response = self.client.get(f"/api/users/{self.user.pk}/", {"fields": "id,username,email"})
+        assert response.status_code == 200
+        assert response.data == {"id": self.user.pk, "username": self.user.username, "email": self.user.email}
+
+        other = User.objects.create(username="fields_viewer", email="fields_viewer@example.com")
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f"/api/users/{self.user.pk}/", {"exclude": "profile_image,bio"})
+        assert response.status_code == 200
+        assert "email" not in response.data and "bio" not in response.data
+        assert "location" in response.data
+
+    def test_user_profile_unknown_field(self):
+        response = self.client.get(f"/api/users/{self.user.pk}/", {"fields": "password"})
+        assert response.status_code == 400
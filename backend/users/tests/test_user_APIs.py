@@ -3,6 +3,7 @@ import json
 from unittest.mock import patch
 from rest_framework.test import APIClient
 from users.models import User
+from users.usernames import usernames
 from storages.backends.s3boto3 import S3Boto3Storage
 
 @pytest.mark.django_db
@@ -203,6 +204,8 @@ class TestUserIdToUsernameAPI:
         # Fix 3: Authenticate the client for each test
         self.authenticated_client = APIClient()
         self.authenticated_client.force_authenticate(user=self.user1)
+        # Ids are reused between tests, so no cached name may outlive one
+        usernames.clear()
 
     def test_id_to_username_authenticated(self):
         """Test retrieving usernames for valid user IDs."""
@@ -233,4 +236,58 @@ class TestUserIdToUsernameAPI:
         # Fix 3: Use authenticated client
         response = self.authenticated_client.get("/api/users/idtoname/", {"participants": "999,1000"})
         assert response.status_code == 200
-        assert response.data["usernames"] == [None, None]
\ No newline at end of file
+        assert response.data["usernames"] == [None, None]
+
+    def test_id_to_username_order_and_duplicates(self):
+        """Test input order, repeated ids and unknown ids are all preserved."""
+        response = self.authenticated_client.get(
+            "/api/users/idtoname/",
+            {"participants": f"{self.user2.id},999,{self.user1.id},{self.user2.id}"},
+        )
+        assert response.status_code == 200
+        assert response.data["usernames"] == ["bbb", None, "aaa", "bbb"]
+
+    def test_id_to_username_out_of_range_ids(self):
+        """Test ids too large or small for the database map to None instead of failing."""
+        response = self.authenticated_client.get(
+            "/api/users/idtoname/",
+            {"participants": f"99999999999999999999999,{self.user1.id},-99999999999999999999999"},
+        )
+        assert response.status_code == 200
+        assert response.data["usernames"] == [None, "aaa", None]
+
+    def test_id_to_username_single_query(self, django_assert_num_queries):
+        """Test any number of ids is looked up in one query."""
+        ids = [User.objects.create(username=f"bulk{i}", email=f"bulk{i}@example.com").id for i in range(30)]
+        with django_assert_num_queries(1):
+            response = self.authenticated_client.get(
+                "/api/users/idtoname/", {"participants": ",".join(str(pk) for pk in ids)}
+            )
+        assert response.data["usernames"] == [f"bulk{i}" for i in range(30)]
+
+    def test_id_to_username_cached_until_renamed(self, django_assert_num_queries, django_capture_on_commit_callbacks):
+        """Test committed lookups are cached and a username change invalidates them."""
+        params = {"participants": f"{self.user1.id},{self.user2.id}"}
+        with django_capture_on_commit_callbacks(execute=True):
+            self.authenticated_client.get("/api/users/idtoname/", params)
+        with django_assert_num_queries(0):
+            response = self.authenticated_client.get("/api/users/idtoname/", params)
+        assert response.data["usernames"] == ["aaa", "bbb"]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            self.user2.username = "ccc"
+            self.user2.save()
+        response = self.authenticated_client.get("/api/users/idtoname/", params)
+        assert response.data["usernames"] == ["aaa", "ccc"]
+
+    def test_id_to_username_too_many_ids(self, settings):
+        settings.USERNAME_LOOKUP_MAX = 2
+        response = self.authenticated_client.get(
+            "/api/users/idtoname/", {"participants": f"{self.user1.id},{self.user2.id},999"}
+        )
+        assert response.status_code == 400
+        assert response.data["error"] == "At most 2 participants per request"
+
+    def test_id_to_username_invalid_ids(self):
+        response = self.authenticated_client.get("/api/users/idtoname/", {"participants": "1,abc"})
+        assert response.status_code == 400
@@ -0,0 +1,75 @@
+"""
+In-process id => username cache for participants_to_usernames.
+
+Misses are looked up in one query, and only committed rows are cached (as in
+events.lookups), so a rolled-back rename can't leave a stale name behind. User.save()
+forgets an id whose username may have changed; other processes notice when their entry
+expires. Size and TTL come from USERNAME_CACHE_SIZE / USERNAME_CACHE_TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.db import connection, transaction
+
+
+class UsernameCache:
+    """
+    Bounded LRU of usernames by user id, with a TTL
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _remember(self, names, now):
+        maxsize = getattr(settings, 'USERNAME_CACHE_SIZE', 10000)
+        if maxsize <= 0:
+            return
+
+        def remember():
+            with self._lock:
+                for pk, username in names.items():
+                    self._entries[pk] = (now, username)
+                    self._entries.move_to_end(pk)
+                while len(self._entries) > maxsize:
+                    self._entries.popitem(last=False)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(remember)
+        else:
+            remember()
+
+    def get_many(self, ids):
+        """
+        Usernames for ids, in the same order, with None for ids that don't exist
+        """
+        ttl = getattr(settings, 'USERNAME_CACHE_TTL', 300)
+        now = time.monotonic()
+        names = {}
+        with self._lock:
+            for pk in ids:
+                entry = self._entries.get(pk)
+                if entry is not None and now - entry[0] < ttl:
+                    self._entries.move_to_end(pk)
+                    names[pk] = entry[1]
+
+        from .models import User
+        # Ids outside the key's range can't exist, and the database would reject them
+        low, high = connection.ops.integer_field_range(User._meta.pk.get_internal_type())
+        missing = [pk for pk in dict.fromkeys(ids) if pk not in names and low <= pk <= high]
+        if missing:
+            found = dict(User.objects.filter(pk__in=missing).values_list('pk', 'username'))
+            self._remember(found, now)
+            names.update(found)
+        return [names.get(pk) for pk in ids]
+
+    def forget(self, pk):
+        with self._lock:
+            self._entries.pop(pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+usernames = UsernameCache()